@@ -0,0 +1,266 @@
+# backend/alert_rules.py
+"""
+Vectorized alert rule engine.
+
+    python backend/alert_rules.py --bench 200000   # readings/sec per batch size
+"""
+import os
+import json
+import time
+import argparse
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ALERT_RULES_FILE = os.getenv("ALERT_RULES_FILE", os.path.join(BASE_DIR, "data", "alert_rules.json"))
+ACCUM_WINDOW_SEC = int(os.getenv("ALERT_ACCUM_WINDOW_SEC", str(3 * 3600)))
+ACCUM_BUCKET_SEC = 300
+
+LEVELS = ("none", "moderate", "heavy", "severe")
+HEAVY = 2
+
+DEFAULT_RULE = {
+    "moderate": 50.0,
+    "heavy": 100.0,
+    "severe": 150.0,
+    # Rain summed over the accumulation window that raises at least a heavy
+    # alert. Off by default: it only makes sense when a sensor's readings are
+    # per-interval increments, not the instantaneous totals most publishers send
+    "accum_mm": None,
+    # An alert re-arms only after readings drop below hysteresis * threshold
+    "hysteresis": 0.8,
+}
+
+
+def _norm(name):
+    return " ".join(str(name or "").replace("_", " ").split()).upper()
+
+
+def load_rules(path=ALERT_RULES_FILE):
+    """
+    {"default": {...}, "subdivisions": {"Kerala": {"heavy": 120, ...}}}; any
+    key left out falls back to the default rule. Missing file = defaults.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class AlertEngine:
+    """
+    Evaluates batches of readings against per-subdivision thresholds.
+
+    All state lives in NumPy arrays indexed by sensor: the alert level each
+    sensor is currently armed at (hysteresis) and a ring of 5-minute rain
+    buckets covering the accumulation window. A reading raises an alert only
+    when its level goes above the armed level; the armed level is released
+    once readings fall below `hysteresis` times the threshold, so a sensor
+    hovering around a threshold does not alert on every reading.
+
+    Several readings of one sensor in a batch are applied in arrival order
+    (one vectorized round per reading index), so batched and one-by-one
+    evaluation produce the same alerts.
+
+    An alert arms its level as soon as it fires; if it is then not sent
+    (cooldown, delivery failure) the caller hands it back to disarm() so the
+    next reading at that level fires again.
+    """
+
+    def __init__(self, rules=None, defaults=None, window_sec=ACCUM_WINDOW_SEC,
+                 bucket_sec=ACCUM_BUCKET_SEC, capacity=64):
+        rules = load_rules() if rules is None else rules
+        default = {**DEFAULT_RULE, **(defaults or {}), **rules.get("default", {})}
+        table = [default]
+        self._sub_rows = {}
+        for name, rule in rules.get("subdivisions", {}).items():
+            self._sub_rows[_norm(name)] = len(table)
+            table.append({**default, **rule})
+
+        self.thresholds = np.array([[r["moderate"], r["heavy"], r["severe"]] for r in table], dtype=np.float64)
+        self.accum_mm = np.array([r["accum_mm"] if r["accum_mm"] is not None else np.inf for r in table])
+        self.hysteresis = np.array([r["hysteresis"] for r in table], dtype=np.float64)
+
+        self.bucket_sec = bucket_sec
+        self.n_buckets = max(1, window_sec // bucket_sec)
+        self._sensor_rows = {}
+        self._sub_cache = {}
+        self._state = np.zeros(capacity, dtype=np.int8)
+        self._bucket_sum = np.zeros((capacity, self.n_buckets))
+        self._bucket_id = np.full((capacity, self.n_buckets), -1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.evaluated = 0
+        self.fired = 0
+        self.held = 0
+        self.disarmed = 0
+        self.eval_sec = 0.0
+
+    # ---------------- INDEXING ---------------- #
+    def _sensor_row(self, sensor_id):
+        row = self._sensor_rows.get(sensor_id)
+        if row is None:
+            row = self._sensor_rows[sensor_id] = len(self._sensor_rows)
+            if row >= len(self._state):
+                self._grow(2 * len(self._state))
+        return row
+
+    def _grow(self, capacity):
+        n = len(self._state)
+        self._state = np.concatenate([self._state, np.zeros(capacity - n, dtype=np.int8)])
+        self._bucket_sum = np.vstack([self._bucket_sum, np.zeros((capacity - n, self.n_buckets))])
+        self._bucket_id = np.vstack([self._bucket_id, np.full((capacity - n, self.n_buckets), -1, dtype=np.int64)])
+
+    def _sub_row(self, subdivision):
+        row = self._sub_cache.get(subdivision)
+        if row is None:
+            row = self._sub_cache[subdivision] = self._sub_rows.get(_norm(subdivision), 0)
+        return row
+
+    # ---------------- EVALUATION ---------------- #
+    def evaluate(self, readings):
+        """[(sensor_id, entry), ...] -> list of alert dicts, in reading order."""
+        n = len(readings)
+        if not n:
+            return []
+        start = time.perf_counter()
+        now = int(time.time())
+        with self._lock:
+            srow = np.fromiter((self._sensor_row(sid) for sid, _ in readings), dtype=np.int64, count=n)
+            sub = np.fromiter((self._sub_row(e.get("subdivision")) for _, e in readings), dtype=np.int64, count=n)
+            values = np.fromiter((float(e.get("value") or 0) for _, e in readings), dtype=np.float64, count=n)
+            ts = np.fromiter((int(e.get("ts") or now) for _, e in readings), dtype=np.int64, count=n)
+
+            # rank = how many earlier readings of the same sensor are in the batch
+            order = np.argsort(srow, kind="stable")
+            sorted_rows = srow[order]
+            first = np.r_[True, sorted_rows[1:] != sorted_rows[:-1]]
+            group_start = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n) - group_start
+
+            rounds = int(rank.max()) + 1
+            fired = []
+            for r in range(rounds):
+                idx = np.arange(n) if rounds == 1 else np.nonzero(rank == r)[0]
+                fired.extend(self._step(idx, srow[idx], sub[idx], values[idx], ts[idx]))
+            fired.sort()
+
+            self.batches += 1
+            self.evaluated += n
+            self.fired += len(fired)
+            self.eval_sec += time.perf_counter() - start
+
+        alerts = []
+        for i, level, armed, accum, threshold, reason in fired:
+            sensor_id, entry = readings[i]
+            alerts.append({
+                "sensor_id": sensor_id,
+                "entry": entry,
+                "subdivision": entry.get("subdivision") or "Unknown",
+                "value": float(values[i]),
+                "level": level,
+                "armed": armed,   # level the sensor was armed at before this alert
+                "severity": LEVELS[level],
+                "threshold": threshold,
+                "accum_mm": round(accum, 1),
+                "reason": reason,
+            })
+        return alerts
+
+    def _step(self, idx, s, sub, v, t):
+        """One reading per sensor (s has no duplicates)."""
+        # 5-minute rain buckets; a slot is reset when a newer bucket reuses it
+        bucket = t // self.bucket_sec
+        slot = bucket % self.n_buckets
+        current = self._bucket_id[s, slot]
+        newer = bucket > current
+        self._bucket_sum[s[newer], slot[newer]] = 0.0
+        self._bucket_id[s[newer], slot[newer]] = bucket[newer]
+        counted = bucket >= current   # readings older than their slot fall outside the window
+        self._bucket_sum[s[counted], slot[counted]] += v[counted]
+        live = self._bucket_id[s] > (bucket - self.n_buckets)[:, None]
+        accum = (self._bucket_sum[s] * live).sum(axis=1)
+
+        thr = self.thresholds[sub]
+        hyst = self.hysteresis[sub][:, None]
+        level = (v[:, None] > thr).sum(axis=1)
+        release = (v[:, None] > thr * hyst).sum(axis=1)
+        accum_hit = accum > self.accum_mm[sub]
+        level = np.where(accum_hit, np.maximum(level, HEAVY), level)
+        release = np.where(accum > self.accum_mm[sub] * hyst[:, 0], np.maximum(release, HEAVY), release)
+
+        armed = np.minimum(self._state[s], release)
+        fire = level > armed
+        self.held += int(((level > 0) & ~fire).sum())
+        self._state[s] = np.maximum(level, armed)
+
+        out = []
+        for k in np.nonzero(fire)[0]:
+            lvl = int(level[k])
+            by_value = v[k] > thr[k, lvl - 1]
+            out.append((
+                int(idx[k]), lvl, int(armed[k]), float(accum[k]),
+                float(thr[k, lvl - 1]) if by_value else float(self.accum_mm[sub[k]]),
+                "value" if by_value else "accumulation",
+            ))
+        return out
+
+    def disarm(self, sensor_id, level, armed=0):
+        """
+        Undo the arming done by a `level` alert that was not sent, back to
+        the `armed` level it had before, unless the sensor has escalated or
+        been released since.
+        """
+        with self._lock:
+            row = self._sensor_rows.get(sensor_id)
+            if row is None or self._state[row] != level:
+                return False
+            self._state[row] = armed
+            self.disarmed += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sensors": len(self._sensor_rows),
+                "subdivision_rules": len(self._sub_rows),
+                "batches": self.batches,
+                "evaluated": self.evaluated,
+                "fired": self.fired,
+                "held_by_hysteresis": self.held,
+                "disarmed": self.disarmed,
+                "readings_per_sec": round(self.evaluated / self.eval_sec) if self.eval_sec else None,
+            }
+
+
+def _bench(total, sensors=500, subdivisions=36):
+    rng = np.random.default_rng(0)
+    names = [f"Subdivision {i}" for i in range(subdivisions)]
+    rules = {"subdivisions": {name: {"heavy": 90.0 + i} for i, name in enumerate(names)}}
+    base = int(time.time())
+    readings = [
+        (f"sensor{i % sensors}", {"subdivision": names[i % subdivisions], "value": float(v), "ts": base + i // sensors})
+        for i, v in enumerate(rng.gamma(2.0, 30.0, total))
+    ]
+    for batch_size in (1, 100, 1000, 10000):
+        engine = AlertEngine(rules)
+        n = min(total, batch_size * 2000)
+        start = time.perf_counter()
+        fired = sum(len(engine.evaluate(readings[i:i + batch_size])) for i in range(0, n, batch_size))
+        elapsed = time.perf_counter() - start
+        print(f"batch {batch_size:>6}: {n / elapsed:>10,.0f} readings/sec  ({fired} alerts, "
+              f"{engine.held} held by hysteresis)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert rule engine")
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark over N synthetic readings")
+    args = parser.parse_args()
+    if args.bench:
+        _bench(args.bench)
+    else:
+        print(json.dumps(load_rules(), indent=2))
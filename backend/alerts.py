@@ -1,12 +1,19 @@
 # backend/alerts.py
 import os
+import re
 import time
-import json
-import requests
+import threading
 from dotenv import load_dotenv
 
+from http_client import get_session
+
 # For WebPush
-from pywebpush import webpush, WebPushException
+from push import PushEngine
+from subscription_store import open_store
+
+# Rule evaluation
+from alert_rules import AlertEngine, ACCUM_WINDOW_SEC
+from cooldown_store import CooldownStore
 
 # ---------------- LOAD CONFIG ---------------- #
 load_dotenv()
@@ -21,124 +28,348 @@ CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 # WebPush config
 VAPID_PRIVATE_KEY = os.getenv("VAPID_PRIVATE_KEY")
 VAPID_CLAIMS = {"sub": "mailto:your-email@example.com"}  # update this
-SUBSCRIPTIONS_FILE = os.path.join(os.path.dirname(__file__), "data", "pwa_subscriptions.json")
 
-# Prevent spamming alerts
-LAST_ALERTS = {}  # {sensor_id: last_sent_timestamp}
+# Prevent spamming alerts: one cooldown per sensor and alert level (so an
+# escalation is never held back by a lower level's cooldown), shared by every process
+COOLDOWNS = CooldownStore()
+
+def cooldown_key(alert):
+    return f"{alert['sensor_id']}:{alert['level']}"
 
 # ---------------- TELEGRAM ---------------- #
-def send_telegram_message(text: str, silent: bool = False) -> bool:
-    if not BOT_TOKEN or not CHAT_ID:
-        print("❌ Missing TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID")
-        return False
+# TELEGRAM_CHAT_ID may list several chats separated by commas
+CHAT_IDS = [c.strip() for c in (CHAT_ID or "").split(",") if c.strip()]
+TELEGRAM_DIGEST_SEC = float(os.getenv("TELEGRAM_DIGEST_SEC", "0"))      # 0 = send each alert at once
+TELEGRAM_RATE_PER_SEC = float(os.getenv("TELEGRAM_RATE_PER_SEC", "1"))  # per chat
+TELEGRAM_BURST = int(os.getenv("TELEGRAM_BURST", "3"))
+TELEGRAM_MAX_CHARS = 4000   # Telegram rejects messages over 4096 characters
+TELEGRAM_DIGEST_ATTEMPTS = 3   # flushes a digested alert is tried in before it is given back
+
+class TokenBucket:
+    """`rate` sends per second with bursts of `burst`; take() sleeps until a token is free."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Back off after a 429: no tokens until `seconds` from now."""
+        with self.lock:
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+            self.updated = time.monotonic()
 
+_buckets = {}
+_stats_lock = threading.Lock()
+TELEGRAM_STATS = {
+    "queued": 0,       # alerts handed to the digest
+    "suppressed": 0,   # repeat alerts of a sensor already in the pending digest
+    "merged": 0,       # alerts that shared a message with another alert
+    "delivered": 0,    # alerts in messages Telegram accepted
+    "messages": 0,
+    "failed": 0,
+    "requeued": 0,     # alerts of a failed digest message kept for the next flush
+    "dropped": 0,      # alerts given up after TELEGRAM_DIGEST_ATTEMPTS flushes
+    "throttled_sec": 0.0,
+}
+
+def _count(**deltas):
+    with _stats_lock:
+        for k, v in deltas.items():
+            TELEGRAM_STATS[k] += v
+
+def _bucket(chat_id):
+    with _stats_lock:
+        bucket = _buckets.get(chat_id)
+        if bucket is None:
+            bucket = _buckets[chat_id] = TokenBucket(TELEGRAM_RATE_PER_SEC, TELEGRAM_BURST)
+        return bucket
+
+def _send_to_chat(chat_id, text, silent):
+    bucket = _bucket(chat_id)
+    _count(throttled_sec=bucket.take())
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     payload = {
-        "chat_id": CHAT_ID,
+        "chat_id": chat_id,
         "text": text,
         "parse_mode": "Markdown",
         "disable_notification": silent,
     }
 
     try:
-        r = requests.post(url, json=payload, timeout=10)
+        r = get_session().post(url, json=payload, timeout=10)
         if r.status_code == 200:
             print(f"✅ Telegram alert sent -> {text[:50]}...")
+            _count(messages=1)
             return True
-        else:
-            print(f"❌ Telegram send failed [{r.status_code}]: {r.text}")
-            return False
+        if r.status_code == 429:
+            bucket.pause(float(r.json().get("parameters", {}).get("retry_after", 1)))
+        print(f"❌ Telegram send failed [{r.status_code}]: {r.text}")
     except Exception as e:
         print(f"❌ Telegram error: {e}")
+    _count(failed=1)
+    return False
+
+def send_telegram_message(text: str, silent: bool = False) -> bool:
+    if not BOT_TOKEN or not CHAT_IDS:
+        print("❌ Missing TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID")
         return False
+    results = [_send_to_chat(chat_id, text, silent) for chat_id in CHAT_IDS]
+    return any(results)
+
+def _md(text):
+    """Escape Telegram (legacy) Markdown so ids/names cannot break a message."""
+    return re.sub(r"([_*`\[])", r"\\\1", str(text))
+
+def _code(text):
+    """Text for inside a `code` span, where only a backtick would end it early."""
+    return str(text).replace("`", "'")
+
+class TelegramDigest:
+    """
+    Collects alerts for `window` seconds and sends them as one message per
+    chat, grouped by severity and subdivision. A sensor that alerts again
+    before the flush only keeps its most severe reading.
+
+    Alerts of a message Telegram did not accept are queued again for the
+    next flush, up to TELEGRAM_DIGEST_ATTEMPTS times. After that they are
+    given back (cooldown released, engine disarmed) unless WebPush already
+    delivered them, so the next reading retries them.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._pending = {}   # sensor_id -> (alert, attempts, delivered by WebPush)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, alert, delivered_elsewhere=False):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telegram-digest", daemon=True)
+                self._thread.start()
+            previous = self._pending.get(alert["sensor_id"])
+            if previous is not None:
+                _count(suppressed=1)
+                if (previous[0]["level"], previous[0]["value"]) >= (alert["level"], alert["value"]):
+                    return
+            else:
+                _count(queued=1)
+            self._pending[alert["sensor_id"]] = (alert, 0, delivered_elsewhere)
+
+    def _run(self):
+        while True:
+            time.sleep(self.window)
+            self.flush()
+
+    @staticmethod
+    def messages(alerts):
+        """[(text, alerts in it)] for a list of alerts, split to Telegram's size limit."""
+        groups = {}
+        for alert in alerts:
+            groups.setdefault(alert["level"], {}).setdefault(alert["subdivision"], []).append(alert)
+
+        lines = [(f"*Rain alerts* — {len(alerts)} sensor{'s' if len(alerts) != 1 else ''}", [])]
+        for level in sorted(groups, reverse=True):
+            lines.append(("", []))
+            lines.append((TITLES[level], []))
+            for subdivision in sorted(groups[level]):
+                readings = sorted(groups[level][subdivision], key=lambda a: -a["value"])
+                sensors = ", ".join(f"`{_code(a['sensor_id'])}` {a['value']:.1f} mm" for a in readings)
+                lines.append((f"• {_md(subdivision)}: {sensors}", readings))
+
+        messages, current, members = [], "", []
+        for line, readings in lines:
+            if current and len(current) + len(line) + 1 > TELEGRAM_MAX_CHARS:
+                messages.append((current, members))
+                current, members = "", []
+            current = f"{current}\n{line}" if current else line
+            members = members + readings
+        messages.append((current, members))
+        return messages
+
+    @classmethod
+    def format(cls, alerts):
+        """Digest message texts for a list of alerts."""
+        return [text for text, _ in cls.messages(alerts)]
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        if len(pending) > 1:
+            _count(merged=len(pending))
+        sent = 0
+        for text, alerts in self.messages([alert for alert, _, _ in pending.values()]):
+            if send_telegram_message(text):
+                sent += 1
+                _count(delivered=len(alerts))
+                continue
+            for alert in alerts:
+                self._retry(*pending[alert["sensor_id"]])
+        return sent
+
+    def _retry(self, alert, attempts, delivered_elsewhere):
+        attempts += 1
+        if attempts < TELEGRAM_DIGEST_ATTEMPTS:
+            with self._lock:
+                # a newer alert of the same sensor replaces this one
+                if alert["sensor_id"] not in self._pending:
+                    self._pending[alert["sensor_id"]] = (alert, attempts, delivered_elsewhere)
+            _count(requeued=1)
+            return
+        _count(dropped=1)
+        if not delivered_elsewhere:
+            give_back(alert)
+
+TELEGRAM_DIGEST = TelegramDigest(TELEGRAM_DIGEST_SEC) if TELEGRAM_DIGEST_SEC > 0 else None
+
+def get_telegram_stats():
+    with _stats_lock:
+        return {
+            "digest_sec": TELEGRAM_DIGEST_SEC,
+            "rate_per_sec": TELEGRAM_RATE_PER_SEC,
+            "chats": len(CHAT_IDS),
+            **TELEGRAM_STATS,
+            "throttled_sec": round(TELEGRAM_STATS["throttled_sec"], 3),
+        }
 
 # ---------------- WEB PUSH ---------------- #
-def send_webpush_notification(payload: dict) -> bool:
+# The process's only subscription store and push engine; app.py's /subscribe
+# writes through them, and other processes (run_alerts.py, mqtt_ingest.py)
+# see those writes via the store's generation counter
+SUBSCRIPTIONS = open_store()
+PUSH_ENGINE = PushEngine(SUBSCRIPTIONS, VAPID_PRIVATE_KEY, VAPID_CLAIMS)
+
+def send_webpush_notification(payload: dict, subdivision: str = None) -> bool:
     if not VAPID_PRIVATE_KEY:
         print("❌ Missing VAPID_PRIVATE_KEY")
         return False
 
-    try:
-        if not os.path.exists(SUBSCRIPTIONS_FILE):
-            print("⚠️ No PWA subscriptions found")
-            return False
-
-        with open(SUBSCRIPTIONS_FILE, "r") as f:
-            subs = json.load(f)
-
-        for sub in subs:
-            try:
-                webpush(
-                    subscription_info=sub,
-                    data=json.dumps(payload),
-                    vapid_private_key=VAPID_PRIVATE_KEY,
-                    vapid_claims=VAPID_CLAIMS,
-                )
-                print("✅ WebPush sent to browser")
-            except WebPushException as e:
-                print(f"❌ WebPush error: {e}")
-        return True
-    except Exception as e:
-        print(f"❌ WebPush general error: {e}")
-        return False
+    # targeted() also applies the subdivision's region to region-pinned subscribers
+    report = PUSH_ENGINE.send_all(payload, SUBSCRIPTIONS.targeted(subdivision))
+    if not report["subscriptions"]:
+        print("⚠️ No PWA subscriptions found")
+    return report["sent"] > 0
 
 # ---------------- ALERT CHECK ---------------- #
-def check_and_send_alert(sensor_id: str, entry: dict):
-    """
-    Called from mqtt_client when new sensor data arrives.
-    entry = {
-      "ts": 172...,
-      "subdivision": "...",
-      "value": 123.4,
-      "lat": 12.34,
-      "lon": 56.78
-    }
-    """
+# One evaluation per reading feeds every channel (Telegram + WebPush)
+# (rules from backend/data/alert_rules.json; ALERT_THRESHOLD_MM is the default moderate level)
+ALERT_ENGINE = AlertEngine(defaults={"moderate": THRESHOLD_MM})
+
+TITLES = {
+    1: "☔ *Moderate Rain Alert*",
+    2: "🌧 *Heavy Rain Alert*",
+    3: "⛈ *Severe Rain Alert*",
+}
+
+def notify(alert: dict):
+    """Send one alert from ALERT_ENGINE to Telegram and WebPush, honouring the cooldown."""
+    delivered = None   # None = cooldown not claimed
     try:
-        value = float(entry.get("value", 0))
-        subdivision = entry.get("subdivision") or "Unknown"
+        sensor_id = alert["sensor_id"]
+        entry = alert["entry"]
+        value = alert["value"]
+        subdivision = alert["subdivision"]
         lat = entry.get("lat")
         lon = entry.get("lon")
-        now = time.time()
 
-        # Cooldown check
-        last_sent = LAST_ALERTS.get(sensor_id, 0)
-        if now - last_sent < COOLDOWN_SEC:
+        # Cooldown check: claimed atomically, so only one worker/process sends.
+        # A rejected alert is disarmed so a later reading retries it.
+        if not COOLDOWNS.acquire(cooldown_key(alert), COOLDOWN_SEC):
+            ALERT_ENGINE.disarm(sensor_id, alert["level"], alert["armed"])
             return
+        delivered = False
 
-        # Determine alert level
-        if value > 150:
-            title = "⛈ *Severe Rain Alert*"
-        elif value > 100:
-            title = "🌧 *Heavy Rain Alert*"
-        elif value > THRESHOLD_MM:
-            title = "☔ *Moderate Rain Alert*"
-        else:
-            return  # No alert
+        title = TITLES[alert["level"]]
 
         # Build message
         lines = [
             title,
-            f"• Sensor: `{sensor_id}`",
-            f"• Subdivision: {subdivision}",
+            f"• Sensor: `{_code(sensor_id)}`",
+            f"• Subdivision: {_md(subdivision)}",
             f"• Amount: *{value:.1f} mm*",
-            f"• Threshold: {THRESHOLD_MM} mm",
         ]
+        if alert["reason"] == "accumulation":
+            lines.append(f"• Last {ACCUM_WINDOW_SEC // 3600}h: *{alert['accum_mm']:.1f} mm* (limit {alert['threshold']} mm)")
+        else:
+            lines.append(f"• Threshold: {alert['threshold']} mm")
         if lat is not None and lon is not None:
             lines.append(f"• Map: https://maps.google.com/?q={lat},{lon}")
 
         message = "\n".join(lines)
 
-        # ✅ Send Telegram
-        sent_telegram = send_telegram_message(message)
-
-        # ✅ Send PWA/WebPush
         payload = {"title": title, "body": f"{subdivision}: {value:.1f} mm rain"}
-        sent_webpush = send_webpush_notification(payload)
 
-        # Update cooldown only if at least one channel succeeded
-        if sent_telegram or sent_webpush:
-            LAST_ALERTS[sensor_id] = now
+        if TELEGRAM_DIGEST is None:
+            # ✅ Send Telegram
+            sent_telegram = send_telegram_message(message)
+            if sent_telegram:
+                _count(delivered=1)
+            # ✅ Send PWA/WebPush
+            sent_webpush = send_webpush_notification(payload, subdivision=entry.get("subdivision"))
+        else:
+            # ✅ Send PWA/WebPush, then queue Telegram for the next digest; the
+            # digest gives the alert back if neither channel delivers it
+            sent_webpush = send_webpush_notification(payload, subdivision=entry.get("subdivision"))
+            TELEGRAM_DIGEST.add(alert, delivered_elsewhere=sent_webpush)
+            sent_telegram = True
+
+        # Keep the cooldown only if at least one channel succeeded
+        delivered = sent_telegram or sent_webpush
 
+    except Exception as e:
+        print(f"❌ Alert send error: {e}")
+    finally:
+        if delivered is False:
+            give_back(alert)
+
+def give_back(alert: dict):
+    """Nothing delivered: as if the alert never fired, so the next reading retries it."""
+    COOLDOWNS.release(cooldown_key(alert))
+    ALERT_ENGINE.disarm(alert["sensor_id"], alert["level"], alert["armed"])
+
+def check_and_send_alerts(readings, submit=None):
+    """
+    Evaluate a batch of (sensor_id, entry) readings at once. Alerts are sent
+    inline, or handed to `submit(fn, *args, key=...)` (AlertDispatcher.submit)
+    so the network calls run on the dispatcher's workers.
+    """
+    try:
+        alerts = ALERT_ENGINE.evaluate(readings)
     except Exception as e:
         print(f"❌ Alert check error: {e}")
+        return []
+    for alert in alerts:
+        if submit is None:
+            notify(alert)
+        else:
+            submit(notify, alert, key=alert["sensor_id"])
+    return alerts
+
+def check_and_send_alert(sensor_id: str, entry: dict):
+    """
+    Called from mqtt_client when new sensor data arrives.
+    entry = {
+      "ts": 172...,
+      "subdivision": "...",
+      "value": 123.4,
+      "lat": 12.34,
+      "lon": 56.78
+    }
+    """
+    check_and_send_alerts([(sensor_id, entry)])
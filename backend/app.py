@@ -4,10 +4,11 @@ import sys
 import threading
 import time
 import json
+import tempfile
 import pandas as pd
 import plotly.express as px
 import folium
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 
 # ---------------- CONFIG PATHS ---------------- #
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -22,12 +23,17 @@ os.makedirs(STATIC_DIR, exist_ok=True)
 sys.path.append(MODEL_DIR)
 
 try:
-    from model.predict_rainfall import predict_next_rainfall, predict_using_realtime
+    from model.predict_rainfall import predict_next_rainfall, predict_using_realtime, predict_many, list_subdivisions, warm_up, get_model_stats, get_prediction_cache_stats
 except Exception:
-    from backend.model.predict_rainfall import predict_next_rainfall, predict_using_realtime
+    from backend.model.predict_rainfall import predict_next_rainfall, predict_using_realtime, predict_many, list_subdivisions, warm_up, get_model_stats, get_prediction_cache_stats
 
-from mqtt_client import start_mqtt
-from alerts import check_and_send_alert
+from mqtt_client import start_mqtt, SnapshotWriter
+from alerts import check_and_send_alert, ALERT_ENGINE, COOLDOWNS, get_telegram_stats
+from dispatch import AlertDispatcher
+from sensor_history import SensorHistory, parse_step
+from sensor_state import SensorTable
+from stream import SensorStream
+from render_cache import RenderCache, content_version
 
 # --- ADD: CORS for API calls --- #
 try:
@@ -40,7 +46,24 @@ app = Flask(__name__, template_folder=os.path.join(PROJECT_ROOT, 'templates'), s
 if CORS:
     CORS(app)
 
-LATEST_SENSORS = {}
+# Latest reading per sensor, shared by /sensor and the MQTT thread
+LATEST_SENSORS = SensorTable()
+
+# Shared by /sensor and the MQTT thread: ingestion only enqueues alert jobs
+ALERT_DISPATCHER = AlertDispatcher().start()
+
+# Coalesced realtime_pdn_data.json writes for the MQTT thread
+SNAPSHOT_WRITER = SnapshotWriter(LATEST_SENSORS, REALTIME_JSON)
+
+# Every reading (REST and MQTT) is kept for trend charts and rolling totals
+SENSOR_HISTORY = SensorHistory().start()
+
+# Live readings pushed to /sensors/stream viewers
+SENSOR_STREAM = SensorStream()
+READING_LISTENERS = [SENSOR_HISTORY.append, SENSOR_STREAM.publish]
+
+# Map pages rendered once per source-data version
+RENDER_CACHE = RenderCache(STATIC_DIR)
 
 """
 # ---------------- FCM TOKEN STORAGE ---------------- #
@@ -96,6 +119,62 @@ def api_predict():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/predict/batch', methods=['POST'])
+def api_predict_batch():
+    data = request.get_json(silent=True) or {}
+    subdivisions = data.get('subdivisions') or list_subdivisions()
+    if not isinstance(subdivisions, list) or not all(isinstance(s, str) for s in subdivisions):
+        return jsonify({'error': 'subdivisions must be a list of names'}), 400
+
+    results = predict_many(subdivisions)
+    for item in results:
+        item['subdivision'] = str(item['subdivision']).strip().title()
+    return jsonify({'count': len(results), 'predictions': results})
+
+@app.route('/metrics/models')
+def model_metrics():
+    return jsonify(get_model_stats())
+
+@app.route('/metrics/alerts')
+def alert_metrics():
+    return jsonify(ALERT_DISPATCHER.stats())
+
+@app.route('/metrics/rules')
+def rule_metrics():
+    return jsonify(ALERT_ENGINE.stats())
+
+@app.route('/metrics/telegram')
+def telegram_metrics():
+    return jsonify(get_telegram_stats())
+
+@app.route('/metrics/cooldowns')
+def cooldown_metrics():
+    return jsonify(COOLDOWNS.stats())
+
+@app.route('/metrics/snapshots')
+def snapshot_metrics():
+    return jsonify(SNAPSHOT_WRITER.stats())
+
+@app.route('/metrics/history')
+def history_metrics():
+    return jsonify(SENSOR_HISTORY.stats())
+
+@app.route('/metrics/sensors')
+def sensor_metrics():
+    return jsonify(LATEST_SENSORS.stats())
+
+@app.route('/metrics/stream')
+def stream_metrics():
+    return jsonify(SENSOR_STREAM.stats())
+
+@app.route('/metrics/maps')
+def map_metrics():
+    return jsonify(RENDER_CACHE.stats())
+
+@app.route('/metrics/predictions')
+def prediction_metrics():
+    return jsonify(get_prediction_cache_stats())
+
 # ---------------- SENSOR POST ---------------- #
 @app.route('/sensor', methods=['POST'])
 def sensor_post():
@@ -113,18 +192,68 @@ def sensor_post():
         'subdivision': data.get('subdivision')
     }
     LATEST_SENSORS[sensor_id] = entry
+    for listener in READING_LISTENERS:
+        listener(sensor_id, entry)
 
-    # Existing Twilio + log alerts
-    threading.Thread(target=check_and_send_alert, args=(sensor_id, entry), daemon=True).start()
-
-    # NEW: Send PWA push alerts
-    threading.Thread(target=lambda: try_pwa_push(sensor_id, entry), daemon=True).start()
+    # Evaluated once; the resulting alert goes to Telegram and WebPush
+    ALERT_DISPATCHER.submit(check_and_send_alert, sensor_id, entry, key=sensor_id)
 
     return jsonify({'status': 'ok'})
 
 @app.route('/sensors/latest')
 def sensors_latest():
-    return jsonify(LATEST_SENSORS)
+    """
+    Full table, or with ?since=<version> only the sensors changed after it.
+    Both carry the table version in X-Sensors-Version; the full table is also
+    tagged with it as an ETag, so an unchanged poll is answered with a 304.
+    """
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an integer version'}), 400
+        version, changed = LATEST_SENSORS.changed_since(since)
+        # A version this table never handed out (client clock/state is off): resend everything
+        reset = since > version
+        if reset:
+            version, changed = LATEST_SENSORS.changed_since(0)
+        resp = jsonify({'version': version, 'reset': reset, 'sensors': changed})
+    else:
+        version, body = LATEST_SENSORS.snapshot()
+        resp = Response(body, mimetype='application/json')
+        resp.set_etag(str(version))
+        resp = resp.make_conditional(request)
+    resp.headers['X-Sensors-Version'] = str(version)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+@app.route('/sensors/stream')
+def sensors_stream():
+    """Server-Sent Events: a `snapshot` of all sensors, then one `reading` per update."""
+    client = SENSOR_STREAM.subscribe()
+    if client is None:
+        return jsonify({'error': 'too many stream clients'}), 503
+    # Subscribed before the snapshot is taken, so no reading falls in between
+    events = SENSOR_STREAM.events(client, LATEST_SENSORS.snapshot_json())
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/sensors/<sensor_id>/history')
+def sensor_history(sensor_id):
+    try:
+        end = int(request.args.get('to') or time.time())
+        start = int(request.args.get('from') or end - 86400)
+        step = parse_step(request.args.get('step'))
+    except ValueError:
+        return jsonify({'error': 'from/to must be epoch seconds, step e.g. 300, 5m, 1h, 1d or raw'}), 400
+    if start >= end:
+        return jsonify({'error': 'from must be before to'}), 400
+
+    result = SENSOR_HISTORY.query(sensor_id, start, end, step)
+    return jsonify({'sensor_id': sensor_id, 'from': start, 'to': end, **result})
 
 # ---------------- MAP GENERATION ---------------- #
 def generate_map_data():
@@ -137,24 +266,27 @@ def generate_map_data():
     if not {'subdivision', 'latitude', 'longitude'}.issubset(df.columns):
         raise ValueError("CSV must contain 'subdivision', 'latitude', 'longitude' columns.")
 
-    results = []
-    for _, row in df.iterrows():
-        if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-            continue
-        try:
-            pred = predict_next_rainfall(row['subdivision'])
-        except Exception:
-            pred = None
-
-        results.append({
-            "subdivision": row['subdivision'],
-            "latitude": float(row['latitude']),
-            "longitude": float(row['longitude']),
-            "predicted_rainfall": float(pred) if pred is not None else None
-        })
+    # Every row of a subdivision carries the same coordinates, so one point
+    # (and one prediction) per subdivision is enough.
+    points = df.dropna(subset=['latitude', 'longitude']).drop_duplicates(subset=['subdivision'], keep='first')
+    subdivisions = points['subdivision'].tolist()
+    predictions = predict_many(subdivisions)
+
+    results = [
+        {
+            "subdivision": subdivision,
+            "latitude": float(lat),
+            "longitude": float(lon),
+            "predicted_rainfall": pred.get('predicted_rainfall')
+        }
+        for subdivision, lat, lon, pred in zip(subdivisions, points['latitude'], points['longitude'], predictions)
+    ]
 
-    with open(MAP_JSON, 'w') as f:
-        json.dump(results, f, indent=2)
+    temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(MAP_JSON), suffix='.tmp')
+    with os.fdopen(temp_fd, 'w') as f:
+        json.dump(results, f, separators=(',', ':'))
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, MAP_JSON)
     return results
 
 @app.route('/generate-map-data')
@@ -165,13 +297,24 @@ def generate_map_data_route():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# ---------------- MAP RENDER CACHE ---------------- #
+def _read_source(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return content_version(raw), raw
+
+def _html_response(page, mimetype='text/html'):
+    """Serve a cached page, gzip-encoded when the client accepts it."""
+    gzipped = 'gzip' in request.accept_encodings
+    resp = Response(page.gzip if gzipped else page.html, mimetype=mimetype)
+    if gzipped:
+        resp.headers['Content-Encoding'] = 'gzip'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.set_etag(page.version + ('-gz' if gzipped else ''))
+    return resp.make_conditional(request)
+
 # ---------------- FOLIUM MAP (PREDICTED) ---------------- #
-@app.route('/folium-map')
-def folium_map_pred():
-    if not os.path.exists(MAP_JSON):
-        return jsonify({"error": "Run /generate-map-data first"}), 404
-    with open(MAP_JSON) as f:
-        data = json.load(f)
+def _render_folium_pred(data):
     df = pd.DataFrame(data)
 
     m = folium.Map(location=[22.9734, 78.6569], zoom_start=5, tiles="CartoDB positron")
@@ -182,7 +325,7 @@ def folium_map_pred():
         "lightblue", "lightgreen", "gray", "black", "lightgray"
     ]
 
-    for idx, row in df.iterrows():
+    for idx, row in zip(df.index, df.to_dict('records')):
         color_choice = colors[idx % len(colors)]
         val = row.get('predicted_rainfall', 0) or 0
 
@@ -203,25 +346,19 @@ def folium_map_pred():
             fill_opacity=0.85
         ).add_to(m)
 
-    file_path = os.path.join(STATIC_DIR, 'folium_pred.html')
-    m.save(file_path)
-    return app.send_static_file('folium_pred.html')
+    return m.get_root().render()
 
-# ---------------- FOLIUM MAP (REALTIME) ---------------- #
-@app.route('/folium-realtime')
-def folium_map_realtime():
-    if not os.path.exists(REALTIME_JSON):
-        return jsonify({"error": "realtime_pdn_data.json not found. Please run mqtt_publisher.py first."}), 404
-
-    try:
-        with open(REALTIME_JSON) as f:
-            data = json.load(f)
-    except Exception as e:
-        return jsonify({"error": f"Error reading JSON: {str(e)}"}), 500
-
-    if not data:
-        return jsonify({"error": "No real-time sensor data in file"}), 404
+@app.route('/folium-map')
+def folium_map_pred():
+    if not os.path.exists(MAP_JSON):
+        return jsonify({"error": "Run /generate-map-data first"}), 404
+    version, raw = _read_source(MAP_JSON)
+    page = RENDER_CACHE.get('folium_pred', version,
+                            lambda: _render_folium_pred(json.loads(raw)), 'folium_pred.html')
+    return _html_response(page)
 
+# ---------------- FOLIUM MAP (REALTIME) ---------------- #
+def _render_folium_realtime(data):
     df = pd.DataFrame(data)
     df = df.sort_values("sensor_id").drop_duplicates(subset=["subdivision"], keep="last")
 
@@ -233,7 +370,7 @@ def folium_map_realtime():
         "lightblue", "lightgreen", "gray", "black", "lightgray"
     ]
 
-    for idx, row in df.iterrows():
+    for idx, row in zip(df.index, df.to_dict('records')):
         color_choice = colors[idx % len(colors)]
         rainfall_val = float(row.get('value', 0))
 
@@ -262,21 +399,28 @@ def folium_map_realtime():
             fill_opacity=0.85
         ).add_to(m)
 
-    file_path = os.path.join(STATIC_DIR, 'folium_realtime.html')
-    m.save(file_path)
-    return app.send_static_file('folium_realtime.html')
+    return m.get_root().render()
 
-# ---------------- PLOTLY MAP ---------------- #
-@app.route('/plotly-map')
-def plotly_map():
-    if not os.path.exists(MAP_JSON):
-        return jsonify({"error": "Run /generate-map-data first"}), 404
-    with open(MAP_JSON) as f:
-        data = json.load(f)
-    df = pd.DataFrame(data)
-    if df.empty:
-        return jsonify({"error": "No data available"}), 400
+@app.route('/folium-realtime')
+def folium_map_realtime():
+    if not os.path.exists(REALTIME_JSON):
+        return jsonify({"error": "realtime_pdn_data.json not found. Please run mqtt_publisher.py first."}), 404
 
+    try:
+        version, raw = _read_source(REALTIME_JSON)
+        data = json.loads(raw)
+    except Exception as e:
+        return jsonify({"error": f"Error reading JSON: {str(e)}"}), 500
+
+    if not data:
+        return jsonify({"error": "No real-time sensor data in file"}), 404
+
+    page = RENDER_CACHE.get('folium_realtime', version,
+                            lambda: _render_folium_realtime(data), 'folium_realtime.html')
+    return _html_response(page)
+
+# ---------------- PLOTLY MAP ---------------- #
+def _render_plotly(df):
     fig = px.scatter_mapbox(
         df, lat='latitude', lon='longitude',
         color='predicted_rainfall', size='predicted_rainfall',
@@ -285,70 +429,126 @@ def plotly_map():
         zoom=4, height=750, color_continuous_scale=px.colors.sequential.Viridis
     )
     fig.update_layout(mapbox_style='open-street-map', margin={'r':0,'t':0,'l':0,'b':0})
+    return fig.to_html(full_html=False, include_plotlyjs='cdn')
 
-    file_path = os.path.join(STATIC_DIR, 'plotly_map.html')
-    fig.write_html(file_path, full_html=False, include_plotlyjs='cdn')
-    return app.send_static_file('plotly_map.html')
+@app.route('/plotly-map')
+def plotly_map():
+    if not os.path.exists(MAP_JSON):
+        return jsonify({"error": "Run /generate-map-data first"}), 404
+    version, raw = _read_source(MAP_JSON)
+    data = json.loads(raw)
+    if not data:
+        return jsonify({"error": "No data available"}), 400
+    page = RENDER_CACHE.get('plotly_map', version,
+                            lambda: _render_plotly(pd.DataFrame(data)), 'plotly_map.html')
+    return _html_response(page)
+
+# ---------------- CLIENT-SIDE MAP (GEOJSON) ---------------- #
+def _point(lon, lat, props):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [round(float(lon), 5), round(float(lat), 5)]},
+        "properties": props,
+    }
 
-# ---------------- PWA PUSH ALERT SUPPORT ---------------- #
-from pywebpush import webpush, WebPushException
+def _predicted_features(data):
+    return [
+        _point(row['longitude'], row['latitude'], {"name": row['subdivision'], "mm": row.get('predicted_rainfall')})
+        for row in data
+        if row.get('latitude') is not None and row.get('longitude') is not None
+    ]
 
-VAPID_PUBLIC_KEY = "YOUR_PUBLIC_KEY"   # Replace with generated
-VAPID_PRIVATE_KEY = "YOUR_PRIVATE_KEY" # Replace with generated
-VAPID_CLAIMS = {"sub": "mailto:you@example.com"}
+def _sensor_features(records):
+    return [
+        _point(rec.lon, rec.lat, {"id": rec.sensor_id, "name": rec.subdivision, "mm": rec.value, "ts": rec.ts})
+        for rec in records
+        if rec.lat is not None and rec.lon is not None
+    ]
 
-SUBSCRIPTIONS_FILE = os.path.join(PROJECT_ROOT, 'data', 'subscriptions.json')
+def _geojson(features, **members):
+    return json.dumps({"type": "FeatureCollection", **members, "features": features}, separators=(',', ':'))
 
-def _load_subscriptions():
-    try:
-        with open(SUBSCRIPTIONS_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+@app.route('/maps')
+def maps_page():
+    return render_template('maps.html')
+
+@app.route('/maps/data/predicted')
+def maps_data_predicted():
+    if not os.path.exists(MAP_JSON):
+        return jsonify({"error": "Run /generate-map-data first"}), 404
+    version, raw = _read_source(MAP_JSON)
+    page = RENDER_CACHE.get('geo_predicted', version,
+                            lambda: _geojson(_predicted_features(json.loads(raw))))
+    return _html_response(page, 'application/geo+json')
+
+@app.route('/maps/data/realtime')
+def maps_data_realtime():
+    """Sensor points as GeoJSON; ?since=<version> returns only the sensors changed after it."""
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an integer version'}), 400
+        version = LATEST_SENSORS.version
+        records = [rec for rec in LATEST_SENSORS.records() if rec.version > since or since > version]
+        resp = Response(_geojson(_sensor_features(records), version=version, partial=since <= version),
+                        mimetype='application/geo+json')
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
+
+    version = LATEST_SENSORS.version
+    page = RENDER_CACHE.get('geo_realtime', str(version),
+                            lambda: _geojson(_sensor_features(LATEST_SENSORS.records()), version=version, partial=False))
+    resp = _html_response(page, 'application/geo+json')
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
 
-def _save_subscriptions(subs):
-    os.makedirs(os.path.dirname(SUBSCRIPTIONS_FILE), exist_ok=True)
-    with open(SUBSCRIPTIONS_FILE, 'w') as f:
-        json.dump(subs, f, indent=2)
+# ---------------- PWA PUSH ALERT SUPPORT ---------------- #
+# One store and one engine, shared with the sensor alerts in alerts.py
+# (VAPID_PRIVATE_KEY comes from the environment there); keyed by endpoint
+# and seeded from data/subscriptions.json on first start
+from alerts import SUBSCRIPTIONS, PUSH_ENGINE
 
-SUBSCRIPTIONS = _load_subscriptions()
+VAPID_PUBLIC_KEY = "YOUR_PUBLIC_KEY"   # Replace with generated
 
-@app.route("/subscribe", methods=["POST"])
+@app.route("/subscribe", methods=["POST", "DELETE"])
 def subscribe():
-    sub = request.get_json()
-    SUBSCRIPTIONS.append(sub)
-    _save_subscriptions(SUBSCRIPTIONS)
+    """
+    Body is the browser's PushSubscription JSON, or
+    {"subscription": {...}, "subdivision": "...", "region": "..."} to only
+    receive alerts for that subdivision, or for the subdivisions of that
+    region (subscription_store.REGIONS: Northwest, Central, South, East).
+    """
+    data = request.get_json(silent=True) or {}
+    sub = data.get("subscription", data)
+    if not isinstance(sub, dict) or not sub.get("endpoint"):
+        return jsonify({"error": "subscription endpoint required"}), 400
+    if request.method == "DELETE":
+        SUBSCRIPTIONS.remove(sub["endpoint"])
+        return jsonify({"message": "Unsubscribed"})
+    try:
+        SUBSCRIPTIONS.upsert(sub, subdivision=data.get("subdivision"), region=data.get("region"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify({"message": "Subscribed successfully!"})
 
-def send_push_to_all(title, body):
-    for sub in SUBSCRIPTIONS:
-        try:
-            webpush(
-                subscription_info=sub,
-                data=json.dumps({"title": title, "message": body}),
-                vapid_private_key=VAPID_PRIVATE_KEY,
-                vapid_claims=VAPID_CLAIMS
-            )
-        except WebPushException as e:
-            print("Push failed:", e)
-
-def try_pwa_push(sensor_id, entry):
-    try:
-        value = float(entry.get('value', 0))
-        if value >= 100:  # Example threshold
-            title = '⚠ Heavy Rain Alert'
-            body = f"Sensor {sensor_id} reported {value} mm."
-            send_push_to_all(title, body)
-    except Exception as e:
-        print("PWA push error:", e)
+def send_push_to_all(title, body, subdivision=None):
+    """Push to every subscriber, or only those following `subdivision` (plus untargeted ones)."""
+    return PUSH_ENGINE.send_all({"title": title, "message": body}, SUBSCRIPTIONS.targeted(subdivision))
 
 @app.route("/alerts/test-pwa", methods=["POST"])
 def test_pwa_alert():
     data = request.get_json() or {}
-    send_push_to_all(data.get("title", "🌧 Rain Alert"), data.get("body", "Test push from backend"))
-    return jsonify({"status": "sent"})
+    report = send_push_to_all(data.get("title", "🌧 Rain Alert"), data.get("body", "Test push from backend"))
+    return jsonify({"status": "sent", "report": report})
+
+@app.route("/metrics/push")
+def push_metrics():
+    return jsonify({**PUSH_ENGINE.stats(), "store": SUBSCRIPTIONS.stats()})
 
 # ---------------- MAIN ---------------- #
 if __name__ == '__main__':
-    threading.Thread(target=start_mqtt, args=(LATEST_SENSORS, check_and_send_alert), daemon=True).start()
+    threading.Thread(target=warm_up, daemon=True).start()
+    threading.Thread(target=start_mqtt, args=(LATEST_SENSORS, ALERT_DISPATCHER.callback(check_and_send_alert), SNAPSHOT_WRITER, READING_LISTENERS), daemon=True).start()
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
\ No newline at end of file
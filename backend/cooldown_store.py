@@ -0,0 +1,125 @@
+# backend/cooldown_store.py
+import os
+import time
+import sqlite3
+import threading
+
+COOLDOWN_DB = os.getenv(
+    "ALERT_COOLDOWN_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'alert_cooldowns.db')
+)
+COMPACT_EVERY_SEC = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cooldowns (
+    key TEXT PRIMARY KEY,
+    until REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Takes the cooldown only if there is none or it has expired; one statement,
+# so the check and the set are atomic across every process using the file.
+ACQUIRE = """
+INSERT INTO cooldowns (key, until) VALUES (?, ?)
+ON CONFLICT (key) DO UPDATE SET until = excluded.until
+WHERE cooldowns.until <= ?
+"""
+
+
+class CooldownStore:
+    """
+    Alert cooldowns shared by every process on the host (Flask/gunicorn
+    workers, run_alerts.py, mqtt_ingest.py) through one SQLite file in WAL
+    mode, so they also survive restarts.
+
+    acquire() is an atomic check-and-set: exactly one caller gets True per
+    key and cooldown period. Cooldowns this process claimed itself (and has
+    not released) are answered from memory without touching the file; a
+    cooldown held by another process is always checked in SQLite, since that
+    process may release it early. Expired rows are deleted every
+    COMPACT_EVERY_SEC.
+    """
+
+    def __init__(self, path=COOLDOWN_DB):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._known = {}   # key -> until, cooldowns this process claimed
+        self._last_compact = 0.0
+
+        self.acquired = 0
+        self.rejected = 0
+        self.memory_hits = 0
+        self.released = 0
+        self.compacted = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit: every statement is its own transaction
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def acquire(self, key, ttl, now=None):
+        """True if `key` was not cooling down; it then is for `ttl` seconds."""
+        now = time.time() if now is None else now
+        key = str(key)
+        with self._lock:
+            if self._known.get(key, 0) > now:
+                self.memory_hits += 1
+                self.rejected += 1
+                return False
+
+        conn = self._conn()
+        if conn.execute(ACQUIRE, (key, now + ttl, now)).rowcount == 1:
+            with self._lock:
+                self._known[key] = now + ttl
+                self.acquired += 1
+            self._maybe_compact(now)
+            return True
+
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def release(self, key):
+        """Drop a cooldown (e.g. no channel delivered the alert)."""
+        key = str(key)
+        self._conn().execute("DELETE FROM cooldowns WHERE key = ?", (key,))
+        with self._lock:
+            self._known.pop(key, None)
+            self.released += 1
+
+    def _maybe_compact(self, now):
+        if now - self._last_compact < COMPACT_EVERY_SEC:
+            return
+        self._last_compact = now
+        self.compact(now)
+
+    def compact(self, now=None):
+        now = time.time() if now is None else now
+        removed = self._conn().execute("DELETE FROM cooldowns WHERE until <= ?", (now,)).rowcount
+        with self._lock:
+            self._known = {k: until for k, until in self._known.items() if until > now}
+            self.compacted += removed
+        return removed
+
+    def stats(self):
+        active = self._conn().execute(
+            "SELECT COUNT(*) FROM cooldowns WHERE until > ?", (time.time(),)
+        ).fetchone()[0]
+        with self._lock:
+            return {
+                "path": self.path,
+                "active": active,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "memory_hits": self.memory_hits,
+                "released": self.released,
+                "compacted": self.compacted,
+            }
@@ -0,0 +1,142 @@
+# backend/dispatch.py
+import os
+import time
+import queue
+import threading
+import zlib
+
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", "4"))
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "1000"))
+ALERT_QUEUE_BLOCK_MS = float(os.getenv("ALERT_QUEUE_BLOCK_MS", "0"))
+
+
+class AlertDispatcher:
+    """
+    Bounded queue + fixed worker pool for alert/notification jobs.
+
+    Ingestion (Flask /sensor, MQTT on_message) only enqueues; Telegram and
+    WebPush calls run on the workers. Jobs with the same `key` (sensor id)
+    always land on the same worker, so one sensor's alerts stay ordered and
+    its cooldown check is never raced by a second worker.
+
+    When a worker's queue is full, submit() waits up to `block_ms` (0 = not at
+    all) and then drops the job, counting it in `dropped`.
+    """
+
+    def __init__(self, workers=ALERT_WORKERS, queue_size=ALERT_QUEUE_SIZE,
+                 block_ms=ALERT_QUEUE_BLOCK_MS, name="alerts"):
+        self.name = name
+        self.block_sec = block_ms / 1000.0
+        per_worker = max(1, queue_size // max(1, workers))
+        self._queues = [queue.Queue(maxsize=per_worker) for _ in range(max(1, workers))]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._rr = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.max_depth = 0
+        self.busy_sec = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            for n, q in enumerate(self._queues):
+                t = threading.Thread(target=self._worker, args=(q,), name=f"{self.name}-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def _pick(self, key):
+        if key is None:
+            with self._lock:
+                self._rr = (self._rr + 1) % len(self._queues)
+                return self._queues[self._rr]
+        return self._queues[zlib.crc32(str(key).encode()) % len(self._queues)]
+
+    def submit(self, fn, *args, key=None):
+        """Enqueue fn(*args). Returns False if the job was dropped."""
+        q = self._pick(key)
+        job = (fn, args)
+        try:
+            q.put_nowait(job)
+        except queue.Full:
+            if self.block_sec <= 0:
+                with self._lock:
+                    self.dropped += 1
+                return False
+            with self._lock:
+                self.blocked += 1
+            try:
+                q.put(job, timeout=self.block_sec)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+                return False
+
+        with self._lock:
+            self.submitted += 1
+            depth = q.qsize()
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return True
+
+    def callback(self, fn):
+        """Wrap fn(sensor_id, entry) so calling it enqueues instead of running inline."""
+        def enqueue(sensor_id, entry):
+            return self.submit(fn, sensor_id, entry, key=sensor_id)
+        return enqueue
+
+    def _worker(self, q):
+        while True:
+            job = q.get()
+            if job is None:
+                q.task_done()
+                return
+            fn, args = job
+            start = time.perf_counter()
+            try:
+                fn(*args)
+                ok = True
+            except Exception as e:
+                ok = False
+                print(f"❌ {self.name} job {getattr(fn, '__name__', fn)} failed: {e}")
+            finally:
+                q.task_done()
+            with self._lock:
+                self.busy_sec += time.perf_counter() - start
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def join(self):
+        """Block until every queued job has run (for scripts and shutdown)."""
+        for q in self._queues:
+            q.join()
+
+    def stop(self):
+        for q in self._queues:
+            q.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._queues),
+                "queue_capacity": sum(q.maxsize for q in self._queues),
+                "queued": sum(q.qsize() for q in self._queues),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "blocked": self.blocked,
+                "busy_sec": round(self.busy_sec, 3),
+            }
@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score, accuracy_score, precision_score, recall_score, f1_score
@@ -11,29 +12,26 @@ DATA_PATH = os.path.join(BASE_DIR, "..", "data", "Rain_data.csv")
 RESULTS_PATH = os.path.join(BASE_DIR, "..", "data", "actual_vs_predicted.csv")
 METRICS_PATH = os.path.join(BASE_DIR, "..", "data", "metrics.csv")
 
+sys.path.append(os.path.join(BASE_DIR, "model"))
+from windowing import series_by_subdivision, subdivision_windows, make_tf_dataset
+
 # Load dataset
 df = pd.read_csv(DATA_PATH)
 
-# Select only the column you used for training
-values = df["ANNUAL"].values.reshape(-1, 1)
-
 # Load scaler and model
 scaler = joblib.load(os.path.join(BASE_DIR, "model", "scaler.pkl"))
 model = load_model(os.path.join(BASE_DIR, "model", "lstm_model.h5"))
 
-# Scale the values
-values_scaled = scaler.transform(values)
-
-# Create sequences (same as training)
+# Create sequences (same as training: ANNUAL, 10 years, within each subdivision)
 sequence_length = 10
-X, y = [], []
-for i in range(len(values_scaled) - sequence_length):
-    X.append(values_scaled[i:i+sequence_length])
-    y.append(values_scaled[i+sequence_length])
-X, y = np.array(X), np.array(y)
+series = series_by_subdivision(df, "ANNUAL")
+(X, y, subdivisions), _ = subdivision_windows(
+    series, sequence_length, train_fraction=1.0,
+    transform=lambda name, values: scaler.transform(values.reshape(-1, 1)),
+)
 
 # Predict
-y_pred = model.predict(X)
+y_pred = model.predict(make_tf_dataset(X, batch_size=256))
 
 # Inverse scale
 y_true = scaler.inverse_transform(y.reshape(-1, 1))
@@ -41,6 +39,7 @@ y_pred_rescaled = scaler.inverse_transform(y_pred)
 
 # Save results
 results = pd.DataFrame({
+    "Subdivision": subdivisions,
     "Actual_Rainfall": y_true.flatten(),
     "Predicted_Rainfall": y_pred_rescaled.flatten()
 })
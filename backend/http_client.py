@@ -0,0 +1,54 @@
+# backend/http_client.py
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))   # hosts kept in the pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))           # keep-alive sockets per host
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_SEC = float(os.getenv("HTTP_BACKOFF_SEC", "0.5"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    # Connect errors are retried for every method (nothing was sent yet).
+    # Read errors and 502/503/504 only for GET: a POST (Telegram message,
+    # WebPush) may already have been handled, and retrying it duplicates the
+    # alert. 429 is left to the caller (alerts.TokenBucket.pause), so no
+    # worker sleeps inside urllib3 on Retry-After.
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_SEC,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Process-wide requests.Session shared by Telegram, OpenWeatherMap and
+    WebPush calls. Connections stay alive between calls, so only the first
+    request to a host pays the TCP + TLS handshake.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
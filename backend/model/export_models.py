@@ -0,0 +1,129 @@
+# backend/model/export_models.py
+"""
+Export the trained .keras models to .tflite for the TensorFlow-free serving
+path (PREDICT_BACKEND=tflite) and check that both give the same predictions.
+
+    python backend/model/export_models.py            # export + parity check
+    python backend/model/export_models.py --check    # parity check only
+"""
+import os
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
+
+import sys
+import glob
+import argparse
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from tflite_model import TFLiteModel
+
+PARITY_TOLERANCE = 1e-4   # max abs difference on the scaled [0, 1] output
+PARITY_SAMPLES = 64
+
+# TFLite bakes the batch size into the graph. Per-subdivision models are
+# called with one window at a time; the shared model serves every
+# subdivision in a single invoke.
+EXPORT_BATCH = 1
+SHARED_EXPORT_BATCH = 64
+
+
+def keras_model_paths():
+    paths = sorted(glob.glob(os.path.join(BASE_DIR, '*_lstm.keras')))
+    # rainfall_lstm.keras is the global model from train_lstm.py, not served here
+    return [p for p in paths if not os.path.basename(p).startswith(('rainfall_', 'shared_'))]
+
+
+def tflite_path_for(keras_path):
+    return keras_path[:-len('.keras')] + '.tflite'
+
+
+def export_model(keras_path, batch_size=EXPORT_BATCH):
+    import tensorflow as tf
+    from keras.models import load_model
+
+    model = load_model(keras_path)
+    # A dynamic batch leaves TensorList ops the converter cannot lower, so the
+    # graph is traced with a static one; TFLiteModel chunks/pads to match.
+    signature = [
+        tf.TensorSpec((batch_size,) + tuple(spec.shape[1:]), spec.dtype)
+        for spec in model.inputs
+    ]
+    if len(signature) == 1:
+        fn = tf.function(lambda x: model(x, training=False), input_signature=signature)
+    else:
+        fn = tf.function(lambda *xs: model(list(xs), training=False), input_signature=signature)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([fn.get_concrete_function()])
+    tflite_bytes = converter.convert()
+
+    out_path = tflite_path_for(keras_path)
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(tflite_bytes)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _sample_inputs(keras_model, rng):
+    inputs = []
+    for spec in keras_model.inputs:
+        shape = (PARITY_SAMPLES,) + tuple(spec.shape[1:])
+        if 'int' in str(spec.dtype):
+            inputs.append(rng.integers(0, _embedding_rows(keras_model), size=shape).astype(np.int32))
+        else:
+            inputs.append(rng.random(shape, dtype=np.float32))
+    return inputs
+
+
+def _embedding_rows(keras_model):
+    for layer in keras_model.layers:
+        if layer.__class__.__name__ == 'Embedding':
+            return layer.input_dim
+    return 1
+
+
+def parity_error(keras_path, seed=0):
+    """Max abs difference between Keras and TFLite outputs on random scaled windows."""
+    from keras.models import load_model
+
+    keras_model = load_model(keras_path)
+    lite_model = TFLiteModel(tflite_path_for(keras_path))
+    inputs = _sample_inputs(keras_model, np.random.default_rng(seed))
+
+    expected = np.asarray(keras_model(inputs if len(inputs) > 1 else inputs[0], training=False))
+    actual = lite_model(*inputs)
+    return float(np.max(np.abs(expected - actual)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export LSTM models to TFLite")
+    parser.add_argument('--check', action='store_true', help="only run the parity check")
+    parser.add_argument('models', nargs='*', help="model files (default: every *_lstm.keras)")
+    args = parser.parse_args()
+
+    paths = args.models or keras_model_paths()
+    shared = os.path.join(BASE_DIR, 'shared_lstm.keras')
+    if not args.models and os.path.exists(shared):
+        paths.append(shared)
+
+    failures = 0
+    for path in paths:
+        name = os.path.basename(path)
+        if not args.check:
+            batch_size = SHARED_EXPORT_BATCH if name.startswith('shared_') else EXPORT_BATCH
+            export_model(path, batch_size)
+        err = parity_error(path)
+        ok = err <= PARITY_TOLERANCE
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}: max |keras - tflite| = {err:.2e}")
+
+    if failures:
+        print(f"❌ {failures} model(s) exceed tolerance {PARITY_TOLERANCE}")
+        sys.exit(1)
+    print(f"✅ {len(paths)} model(s) within tolerance {PARITY_TOLERANCE}")
+
+
+if __name__ == '__main__':
+    main()
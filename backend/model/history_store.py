@@ -0,0 +1,116 @@
+# backend/model/history_store.py
+import os
+import difflib
+import threading
+
+import numpy as np
+import pandas as pd
+
+MONTHLY_COLUMNS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+                   'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+SEASONAL_COLUMNS = ['Jan-Feb', 'Mar-May', 'June-September', 'Oct-Dec']
+VALUE_COLUMNS = ['ANNUAL'] + MONTHLY_COLUMNS + SEASONAL_COLUMNS
+
+FUZZY_CUTOFF = 0.6
+MAX_FUZZY_ALIASES = 1024
+
+
+def normalize_subdivision(name):
+    return ' '.join(str(name).replace('_', ' ').split()).upper()
+
+
+def _aliases_for(name):
+    """Spellings of a subdivision that should resolve to it without fuzzy matching."""
+    variants = {name, name.replace('&', 'AND'), name.replace(' & ', ' '), name.replace('-', ' ')}
+    return {normalize_subdivision(v) for v in variants}
+
+
+class RainfallHistory:
+    """
+    Rain_data.csv parsed once into per-subdivision, year-sorted NumPy arrays.
+
+    Subdivision lookups are dict hits on the normalized name; anything else
+    goes through difflib once and the result is remembered in the alias table.
+    The file is re-parsed only when its mtime/size changes (see `refresh`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.version = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Rain_data.csv not found at {self.path}")
+
+        st = os.stat(self.path)
+        df = pd.read_csv(self.path)
+        df['SUBDIVISION'] = df['SUBDIVISION'].map(normalize_subdivision)
+        df = df.sort_values(['SUBDIVISION', 'YEAR'], kind='stable')
+
+        columns = [c for c in VALUE_COLUMNS if c in df.columns]
+        series, coords = {}, {}
+        for name, group in df.groupby('SUBDIVISION', sort=False):
+            arrays = {'YEAR': group['YEAR'].to_numpy()}
+            for col in columns:
+                arrays[col] = group[col].to_numpy(dtype=np.float64)
+            series[name] = arrays
+            if {'Latitude', 'Longitude'}.issubset(group.columns):
+                located = group[['Latitude', 'Longitude']].dropna()
+                if not located.empty:
+                    coords[name] = (float(located.iloc[0, 0]), float(located.iloc[0, 1]))
+
+        aliases = {}
+        for name in series:
+            for alias in _aliases_for(name):
+                aliases.setdefault(alias, name)
+
+        self._series = series
+        self._coords = coords
+        self._aliases = aliases
+        self._fuzzy = {}
+        self.subdivisions = list(series)
+        self.version = (st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """Re-parse the CSV if it changed on disk. Returns True when reloaded."""
+        st = os.stat(self.path)
+        if (st.st_mtime_ns, st.st_size) == self.version:
+            return False
+        with self._lock:
+            st = os.stat(self.path)
+            if (st.st_mtime_ns, st.st_size) == self.version:
+                return False
+            self._load()
+        return True
+
+    def resolve(self, subdivision):
+        """Canonical subdivision name for `subdivision`, or ValueError."""
+        key = normalize_subdivision(subdivision)
+        matched = self._aliases.get(key)
+        if matched is not None:
+            return matched
+
+        if key in self._fuzzy:
+            matched = self._fuzzy[key]
+        else:
+            closest = difflib.get_close_matches(key, self.subdivisions, n=1, cutoff=FUZZY_CUTOFF)
+            matched = closest[0] if closest else None
+            if len(self._fuzzy) >= MAX_FUZZY_ALIASES:
+                self._fuzzy.clear()
+            self._fuzzy[key] = matched
+
+        if matched is None:
+            raise ValueError(f"Subdivision '{subdivision.strip().upper()}' not found")
+        return matched
+
+    def series(self, subdivision, column='ANNUAL'):
+        return self._series[self.resolve(subdivision)][column]
+
+    def window(self, subdivision, size, column='ANNUAL'):
+        """Last `size` values of `column` for the subdivision (a view, not a copy)."""
+        return self.series(subdivision, column)[-size:]
+
+    def coordinates(self, subdivision):
+        return self._coords.get(self.resolve(subdivision))
@@ -0,0 +1,98 @@
+# backend/model/model_registry.py
+import os
+import threading
+from collections import OrderedDict
+
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, used to notice retrained artifacts."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded subdivision models.
+
+    Each entry is loaded once through `loader(*paths)` and kept resident.
+    On every lookup the artifact files are stat()-ed; if their mtime or size
+    changed the entry is reloaded, so retrained models are picked up without
+    restarting the worker. `max_size` caps the number of resident entries
+    (least recently used ones are evicted), None keeps everything.
+    """
+
+    def __init__(self, loader, max_size=None):
+        self._loader = loader
+        self._max_size = max_size
+        self._entries = OrderedDict()   # key -> (stamp, value)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+        self.loads = 0
+        self.reloads = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _lookup(self, key, stamp):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+        return None
+
+    def get(self, key, paths):
+        """Return the loaded value for `key`, (re)loading it from `paths` if needed."""
+        stamp = tuple(file_stamp(p) for p in paths)
+        value = self._lookup(key, stamp)
+        if value is not None:
+            return value
+
+        # Only one thread loads a given key; the others wait and reuse it.
+        with self._key_lock(key):
+            value = self._lookup(key, stamp)
+            if value is not None:
+                return value
+
+            value = self._loader(*paths)
+            with self._lock:
+                self.misses += 1
+                if key in self._entries:
+                    self.reloads += 1
+                else:
+                    self.loads += 1
+                self._entries[key] = (stamp, value)
+                self._entries.move_to_end(key)
+                while self._max_size and len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return value
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident": len(self._entries),
+                "max_size": self._max_size,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
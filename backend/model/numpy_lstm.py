@@ -0,0 +1,167 @@
+# backend/model/numpy_lstm.py
+"""
+Pure-NumPy forward pass for the Sequential LSTM models in this folder.
+
+Supports the layers train_lstm.py (and the per-subdivision models) use:
+stacked LSTM layers, Dropout (identity at inference) and a final Dense.
+Weights are read straight from the .keras archive (config.json +
+model.weights.h5), so no TensorFlow import is needed.
+
+Several models with the same architecture can be stacked along a leading
+model axis; every time step is then one batched matmul over all of them.
+"""
+import io
+import json
+import zipfile
+
+import numpy as np
+
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'sigmoid': lambda x: 0.5 * (np.tanh(0.5 * x) + 1.0),   # overflow-free logistic
+    'linear': lambda x: x,
+}
+
+
+def _snake_case(name):
+    out = []
+    for i, ch in enumerate(name):
+        if ch.isupper() and i and not name[i - 1].isupper():
+            out.append('_')
+        out.append(ch.lower())
+    return ''.join(out)
+
+
+def _read_keras_archive(path):
+    import h5py
+
+    with zipfile.ZipFile(path) as z:
+        config = json.loads(z.read('config.json'))
+        weights = h5py.File(io.BytesIO(z.read('model.weights.h5')), 'r')
+
+    if config.get('class_name') != 'Sequential':
+        raise ValueError(f"{path}: only Sequential models are supported, got {config.get('class_name')}")
+
+    layers, seen = [], {}
+    try:
+        for layer in config['config']['layers']:
+            kind = layer['class_name']
+            if kind == 'InputLayer':
+                continue
+            # Keras 3 stores weights under layers/<snake_case class>[_<n>]
+            base = _snake_case(kind)
+            n = seen.get(base, 0)
+            seen[base] = n + 1
+            key = f"layers/{base}" if n == 0 else f"layers/{base}_{n}"
+            cfg = layer['config']
+
+            if kind == 'LSTM':
+                v = weights[f"{key}/cell/vars"]
+                layers.append(('lstm', {
+                    'kernel': v['0'][()], 'recurrent': v['1'][()], 'bias': v['2'][()],
+                    'activation': cfg.get('activation', 'tanh'),
+                    'recurrent_activation': cfg.get('recurrent_activation', 'sigmoid'),
+                    'return_sequences': cfg.get('return_sequences', False),
+                }))
+            elif kind == 'Dense':
+                v = weights[f"{key}/vars"]
+                layers.append(('dense', {
+                    'kernel': v['0'][()], 'bias': v['1'][()],
+                    'activation': cfg.get('activation', 'linear'),
+                }))
+            elif kind == 'Dropout':
+                continue
+            else:
+                raise ValueError(f"{path}: unsupported layer {kind}")
+    finally:
+        weights.close()
+    return layers
+
+
+class NumpyLSTM:
+    """
+    Stacked LSTM/Dense forward pass over M models at once.
+
+    `model(x)` takes a (batch, steps, features) window for a single model and
+    returns (batch, units). `forward(x)` takes (M, batch, steps, features)
+    and returns (M, batch, units).
+    """
+
+    def __init__(self, layers):
+        # every array carries a leading model axis
+        self.layers = layers
+        self.n_models = len(layers[0][1]['kernel'])
+
+    @classmethod
+    def from_keras(cls, path, dtype=np.float32):
+        layers = []
+        for kind, p in _read_keras_archive(path):
+            params = dict(p)
+            for name in ('kernel', 'recurrent', 'bias'):
+                if name in params:
+                    params[name] = np.asarray(params[name], dtype=dtype)[np.newaxis]
+            layers.append((kind, params))
+        return cls(layers)
+
+    @property
+    def signature(self):
+        """Architecture key: models with equal signatures can be stacked."""
+        return tuple(
+            (kind, p['kernel'].shape[1:], p['activation'], p.get('recurrent_activation'), p.get('return_sequences'))
+            for kind, p in self.layers
+        )
+
+    @classmethod
+    def stack(cls, models):
+        signatures = {m.signature for m in models}
+        if len(signatures) != 1:
+            raise ValueError("Only models with the same architecture can be stacked")
+        layers = []
+        for n, (kind, first) in enumerate(models[0].layers):
+            params = dict(first)
+            for name in ('kernel', 'recurrent', 'bias'):
+                if name in first:
+                    params[name] = np.concatenate([m.layers[n][1][name] for m in models])
+            layers.append((kind, params))
+        return cls(layers)
+
+    @staticmethod
+    def _lstm(x, p):
+        # x: (M, B, T, F). The input projection for all steps is one matmul.
+        m, b, t, f = x.shape
+        units = p['recurrent'].shape[-2]
+        act = ACTIVATIONS[p['activation']]
+        rec_act = ACTIVATIONS[p['recurrent_activation']]
+
+        xz = np.matmul(x.reshape(m, b * t, f), p['kernel']).reshape(m, b, t, 4 * units)
+        xz += p['bias'][:, np.newaxis, np.newaxis, :]
+
+        h = np.zeros((m, b, units), dtype=x.dtype)
+        c = np.zeros((m, b, units), dtype=x.dtype)
+        outputs = []
+        for step in range(t):
+            z = xz[:, :, step] + np.matmul(h, p['recurrent'])
+            i = rec_act(z[..., :units])
+            f_gate = rec_act(z[..., units:2 * units])
+            g = act(z[..., 2 * units:3 * units])
+            o = rec_act(z[..., 3 * units:])
+            c = f_gate * c + i * g
+            h = o * act(c)
+            if p['return_sequences']:
+                outputs.append(h)
+        return np.stack(outputs, axis=2) if p['return_sequences'] else h
+
+    def forward(self, x):
+        x = np.asarray(x, dtype=self.layers[0][1]['kernel'].dtype)
+        for kind, p in self.layers:
+            if kind == 'lstm':
+                x = self._lstm(x, p)
+            else:
+                x = ACTIVATIONS[p['activation']](np.matmul(x, p['kernel']) + p['bias'][:, np.newaxis, :])
+        return x
+
+    def __call__(self, x):
+        if self.n_models != 1:
+            raise ValueError("Call forward() on a stacked model")
+        return self.forward(np.asarray(x)[np.newaxis])[0]
@@ -2,12 +2,30 @@
 import os
 os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-import pandas as pd
 import joblib
-import difflib
-from keras.models import load_model
-import requests
+
+try:
+    from .model_registry import ModelRegistry, file_stamp
+    from .prediction_cache import PredictionCache
+    from .history_store import RainfallHistory
+    from .shared_model import SubdivisionScaling
+    from .tflite_model import TFLiteModel
+    from .numpy_lstm import NumpyLSTM
+except ImportError:
+    from model_registry import ModelRegistry, file_stamp
+    from prediction_cache import PredictionCache
+    from history_store import RainfallHistory
+    from shared_model import SubdivisionScaling
+    from tflite_model import TFLiteModel
+    from numpy_lstm import NumpyLSTM
+
+try:
+    from http_client import get_session
+except ImportError:
+    from backend.http_client import get_session
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
@@ -15,52 +33,331 @@ DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'Rain_data.csv')
 
 OWM_KEY = os.environ.get('OWM_API_KEY')
 
+# 'keras' (default), 'tflite' (the .tflite exports from export_models.py) or
+# 'numpy' (numpy_lstm.py over the .keras weights); the last two never import
+# TensorFlow in the serving process
+PREDICT_BACKEND = os.environ.get('PREDICT_BACKEND', 'keras')
+MODEL_EXT = '.tflite' if PREDICT_BACKEND == 'tflite' else '.keras'
+
+# 'per_subdivision': one <SUBDIVISION>_lstm.keras + scaler per region (default)
+# 'shared': a single shared_lstm.keras serving every region (train_lstm.py --mode shared)
+MODEL_MODE = os.environ.get('PREDICT_MODEL_MODE', 'per_subdivision')
+SHARED_MODEL_KEY = '__shared__'
+SHARED_MODEL_PATH = os.path.join(BASE_DIR, f'shared_lstm{MODEL_EXT}')
+SHARED_SCALING_PATH = os.path.join(BASE_DIR, 'shared_scaling.npz')
+
+# 0 / unset keeps every subdivision model resident
+MODEL_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', '0')) or None
+
+WINDOW_SIZE = 5
+
+def _load_runner(model_path, with_ids=False):
+    """Callable `runner(x[, ids]) -> (n, 1)` array-like for the configured backend."""
+    if PREDICT_BACKEND == 'tflite':
+        return TFLiteModel(model_path)
+    if PREDICT_BACKEND == 'numpy':
+        if with_ids:
+            raise ValueError("The numpy backend only runs Sequential models, not the shared model")
+        return NumpyLSTM.from_keras(model_path)
+
+    import tensorflow as tf
+    from keras.models import load_model
+
+    model = load_model(model_path)
+    window_spec = tf.TensorSpec([None, WINDOW_SIZE, 1], tf.float32)
+    # Traced once per model; avoids model.predict()'s per-call dispatch overhead
+    if with_ids:
+        return tf.function(
+            lambda x, ids: model([x, ids], training=False),
+            input_signature=[window_spec, tf.TensorSpec([None], tf.int32)],
+        )
+    return tf.function(lambda x: model(x, training=False), input_signature=[window_spec])
+
+def _load_artifacts(model_path, scaler_path):
+    return _load_runner(model_path), joblib.load(scaler_path)
+
+def _load_shared_artifacts(model_path, scaling_path):
+    return _load_runner(model_path, with_ids=True), SubdivisionScaling.load(scaling_path)
+
+def _load_any_artifacts(*paths):
+    if paths[0] == SHARED_MODEL_PATH:
+        return _load_shared_artifacts(*paths)
+    return _load_artifacts(*paths)
+
+MODEL_REGISTRY = ModelRegistry(_load_any_artifacts, max_size=MODEL_CACHE_SIZE)
+
+# Forward passes of different models run concurrently (TF/TFLite release the GIL)
+PREDICT_WORKERS = int(os.environ.get('PREDICT_WORKERS', str(min(4, os.cpu_count() or 1))))
+_predict_pool = ThreadPoolExecutor(max_workers=PREDICT_WORKERS, thread_name_prefix='predict') if PREDICT_WORKERS > 1 else None
+
+def get_model_stats():
+    return MODEL_REGISTRY.stats()
+
+PREDICTION_CACHE = PredictionCache(
+    max_size=int(os.environ.get('PREDICTION_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', '3600')),
+)
+
+def get_prediction_cache_stats():
+    return PREDICTION_CACHE.stats()
+
+HISTORY = RainfallHistory(DATA_PATH)
+
+def get_history():
+    HISTORY.refresh()
+    return HISTORY
+
 def fetch_current_weather(lat, lon):
     if not OWM_KEY or lat is None or lon is None:
         return None
     try:
         url = f'https://api.openweathermap.org/data/2.5/onecall?lat={lat}&lon={lon}&exclude=minutely,hourly&appid={OWM_KEY}&units=metric'
-        r = requests.get(url, timeout=8)
+        r = get_session().get(url, timeout=8)
         r.raise_for_status()
         return r.json()
     except Exception as e:
         print('OWM fetch error', e)
         return None
 
-def predict_next_rainfall(subdivision: str):
+def list_subdivisions():
+    return list(get_history().subdivisions)
+
+def _prediction_version(subdivision: str):
+    """
+    (cache key, version) of a subdivision's prediction, or None when it cannot
+    be cached (missing model, unknown subdivision: the normal path raises).
+    The version changes whenever the model, scaler or Rain_data.csv changes.
+    """
+    try:
+        history = get_history()
+        if MODEL_MODE == 'shared':
+            key = history.resolve(subdivision)
+            paths = (SHARED_MODEL_PATH, SHARED_SCALING_PATH)
+        else:
+            key = subdivision.strip().upper().replace(' ', '_')
+            paths = (
+                os.path.join(BASE_DIR, f"{key}_lstm{MODEL_EXT}"),
+                os.path.join(BASE_DIR, f"{key}_scaler.pkl"),
+            )
+        return key, (MODEL_MODE, PREDICT_BACKEND, tuple(file_stamp(p) for p in paths), history.version)
+    except Exception:
+        return None
+
+def _load_subdivision(subdivision: str):
+    """Resolve a subdivision to (model_name, model, scaler, last WINDOW_SIZE annual values)."""
     subdivision = subdivision.strip().upper()
     model_name = subdivision.replace(' ', '_')
 
-    model_path = os.path.join(BASE_DIR, f"{model_name}_lstm.keras")
+    model_path = os.path.join(BASE_DIR, f"{model_name}_lstm{MODEL_EXT}")
     scaler_path = os.path.join(BASE_DIR, f"{model_name}_scaler.pkl")
 
     if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+        MODEL_REGISTRY.discard(model_name)
         raise FileNotFoundError(f"Model or scaler not found for subdivision: {subdivision}")
 
-    model = load_model(model_path)
-    scaler = joblib.load(scaler_path)
+    model, scaler = MODEL_REGISTRY.get(model_name, (model_path, scaler_path))
+
+    window = get_history().window(subdivision, WINDOW_SIZE)
+    if len(window) < WINDOW_SIZE:
+        raise ValueError('Not enough data for prediction')
+
+    return model_name, model, scaler, window
+
+# The scalers are single-feature MinMaxScalers; applying scale_/min_ directly
+# skips sklearn's per-call input validation, which costs more than the
+# NumPy forward pass itself.
+def _scale(scaler, windows):
+    scaled = np.asarray(windows, dtype=np.float64) * scaler.scale_[0] + scaler.min_[0]
+    return scaled.reshape(-1, WINDOW_SIZE, 1).astype(np.float32)
+
+def _unscale(scaler, pred_scaled):
+    return (np.asarray(pred_scaled, dtype=np.float64).reshape(-1) - scaler.min_[0]) / scaler.scale_[0]
+
+def _run_model(model, scaler, windows):
+    """Predict a (n, WINDOW_SIZE) batch of raw annual values in one forward pass."""
+    return _unscale(scaler, model(_scale(scaler, windows)))
+
+MAX_STACKED_MODELS = 8
+_stacked_models = {}  # tuple of model ids -> (models, stacked NumpyLSTM)
+
+def _stacked_model(models):
+    key = tuple(id(m) for m in models)
+    cached = _stacked_models.get(key)
+    if cached is None:
+        if len(_stacked_models) >= MAX_STACKED_MODELS:
+            _stacked_models.clear()
+        # the models are kept in the value so their ids stay valid
+        cached = _stacked_models[key] = (models, NumpyLSTM.stack(models))
+    return cached[1]
 
-    df = pd.read_csv(DATA_PATH)
-    df['SUBDIVISION'] = df['SUBDIVISION'].str.strip().str.upper()
+def _run_stacked(batch_list):
+    """NumPy backend: all models sharing an architecture run as one stacked pass."""
+    outputs = [None] * len(batch_list)
+    groups = {}
+    for n, (model, _, _) in enumerate(batch_list):
+        groups.setdefault(model.signature, []).append(n)
 
-    all_subdivisions = df['SUBDIVISION'].unique()
-    closest = difflib.get_close_matches(subdivision, all_subdivisions, n=1, cutoff=0.6)
-    if not closest:
-        raise ValueError(f"Subdivision '{subdivision}' not found")
+    for members in groups.values():
+        try:
+            xs = [_scale(batch_list[n][1], np.stack([w for _, w in batch_list[n][2]])) for n in members]
+            X = np.zeros((len(members), max(len(x) for x in xs), WINDOW_SIZE, 1), dtype=np.float32)
+            for j, x in enumerate(xs):
+                X[j, :len(x)] = x
+            out = _stacked_model([batch_list[n][0] for n in members]).forward(X)
+            for j, n in enumerate(members):
+                outputs[n] = _unscale(batch_list[n][1], out[j, :len(xs[j])])
+        except Exception as e:
+            for n in members:
+                outputs[n] = e
+    return outputs
 
-    matched = closest[0]
-    data = df[df['SUBDIVISION'] == matched].sort_values('YEAR')
-    last_5_values = data['ANNUAL'].values[-5:]
+def _run_batches(batch_list):
+    """Predictions (or the exception raised) for each (model, scaler, items) batch."""
+    if PREDICT_BACKEND == 'numpy' and len(batch_list) > 1:
+        return _run_stacked(batch_list)
 
-    if len(last_5_values) < 5:
+    def run_batch(batch):
+        model, scaler, items = batch
+        return _run_model(model, scaler, np.stack([w for _, w in items]))
+
+    if _predict_pool is not None and len(batch_list) > 1:
+        futures = [_predict_pool.submit(run_batch, b) for b in batch_list]
+    else:
+        futures = None
+
+    outputs = []
+    for n, batch in enumerate(batch_list):
+        try:
+            outputs.append(futures[n].result() if futures else run_batch(batch))
+        except Exception as e:
+            outputs.append(e)
+    return outputs
+
+def _load_shared():
+    if not os.path.exists(SHARED_MODEL_PATH) or not os.path.exists(SHARED_SCALING_PATH):
+        MODEL_REGISTRY.discard(SHARED_MODEL_KEY)
+        raise FileNotFoundError(f"Shared model not found at {SHARED_MODEL_PATH}, run train_lstm.py --mode shared")
+    return MODEL_REGISTRY.get(SHARED_MODEL_KEY, (SHARED_MODEL_PATH, SHARED_SCALING_PATH))
+
+def _shared_window(scaling, subdivision: str):
+    """(subdivision id, last WINDOW_SIZE annual values) for the shared model."""
+    history = get_history()
+    name = history.resolve(subdivision)
+    sid = scaling.index.get(name)
+    if sid is None:
+        raise ValueError(f"Subdivision '{name}' is not covered by the shared model")
+    window = history.window(name, WINDOW_SIZE)
+    if len(window) < WINDOW_SIZE:
         raise ValueError('Not enough data for prediction')
+    return sid, window
+
+def _run_shared(infer, scaling, ids, windows):
+    """One forward pass over windows of any mix of subdivisions."""
+    ids = np.asarray(ids, dtype=np.int32)
+    scaled = scaling.transform(ids, windows).reshape(-1, WINDOW_SIZE, 1)
+    pred_scaled = np.asarray(infer(scaled.astype(np.float32), ids))[:, 0]
+    return scaling.inverse_transform(ids, pred_scaled)
+
+def _predict_many_shared(subdivisions):
+    try:
+        infer, scaling = _load_shared()
+    except Exception as e:
+        return [{'subdivision': s, 'error': str(e)} for s in subdivisions]
+
+    results = [None] * len(subdivisions)
+    rows, ids, windows = [], [], []
+    for i, subdivision in enumerate(subdivisions):
+        try:
+            sid, window = _shared_window(scaling, subdivision)
+        except Exception as e:
+            results[i] = {'subdivision': subdivision, 'error': str(e)}
+            continue
+        rows.append(i)
+        ids.append(sid)
+        windows.append(window)
+
+    if rows:
+        preds = _run_shared(infer, scaling, ids, np.stack(windows))
+        for i, pred in zip(rows, preds):
+            results[i] = {'subdivision': subdivisions[i], 'predicted_rainfall': round(float(pred), 2)}
+    return results
+
+def predict_next_rainfall(subdivision: str):
+    cache_key = _prediction_version(subdivision)
+    if cache_key is not None:
+        cached = PREDICTION_CACHE.get(*cache_key)
+        if cached is not None:
+            return cached
+
+    if MODEL_MODE == 'shared':
+        infer, scaling = _load_shared()
+        sid, window = _shared_window(scaling, subdivision)
+        prediction = round(float(_run_shared(infer, scaling, [sid], window[np.newaxis, :])[0]), 2)
+    else:
+        _, model, scaler, window = _load_subdivision(subdivision)
+        prediction = round(float(_run_model(model, scaler, window[np.newaxis, :])[0]), 2)
+
+    if cache_key is not None:
+        PREDICTION_CACHE.put(*cache_key, prediction)
+    return prediction
+
+def predict_many(subdivisions):
+    """
+    Predict several subdivisions at once.
+
+    Cached predictions are reused while their model/data version holds; the
+    rest are computed with windows that share a model stacked into one batch,
+    so each model runs a single forward pass. Returns one dict per input, in
+    input order, with either 'predicted_rainfall' or 'error'.
+    """
+    results = [None] * len(subdivisions)
+    cache_keys = [None] * len(subdivisions)
+    pending = []
+    for i, subdivision in enumerate(subdivisions):
+        cache_keys[i] = _prediction_version(subdivision) if isinstance(subdivision, str) else None
+        cached = PREDICTION_CACHE.get(*cache_keys[i]) if cache_keys[i] is not None else None
+        if cached is not None:
+            results[i] = {'subdivision': subdivision, 'predicted_rainfall': cached}
+        else:
+            pending.append(i)
+
+    if pending:
+        computed = _predict_uncached([subdivisions[i] for i in pending])
+        for i, result in zip(pending, computed):
+            results[i] = result
+            if cache_keys[i] is not None and 'predicted_rainfall' in result:
+                PREDICTION_CACHE.put(*cache_keys[i], result['predicted_rainfall'])
+    return results
+
+def _predict_uncached(subdivisions):
+    if MODEL_MODE == 'shared':
+        return _predict_many_shared(subdivisions)
+
+    results = [None] * len(subdivisions)
+    batches = {}  # model_name -> (model, scaler, [(index, window)])
+
+    for i, subdivision in enumerate(subdivisions):
+        try:
+            model_name, model, scaler, window = _load_subdivision(subdivision)
+        except Exception as e:
+            results[i] = {'subdivision': subdivision, 'error': str(e)}
+            continue
+        batches.setdefault(model_name, (model, scaler, []))[2].append((i, window))
+
+    batch_list = list(batches.values())
+    for (_, _, items), preds in zip(batch_list, _run_batches(batch_list)):
+        if isinstance(preds, Exception):
+            for i, _ in items:
+                results[i] = {'subdivision': subdivisions[i], 'error': str(preds)}
+            continue
+        for (i, _), pred in zip(items, preds):
+            results[i] = {'subdivision': subdivisions[i], 'predicted_rainfall': round(float(pred), 2)}
 
-    scaled_input = scaler.transform(np.array(last_5_values).reshape(-1, 1))
-    X_input = scaled_input.reshape(1, 5, 1)
-    pred_scaled = model.predict(X_input)
-    prediction = float(scaler.inverse_transform(pred_scaled)[0][0])
+    return results
 
-    return round(prediction, 2)
+def warm_up():
+    """Load every subdivision model so the first map/batch request is not a cold start."""
+    return predict_many(list_subdivisions())
 
 def predict_using_realtime(subdivision: str, sensor_entry: dict):
     base_pred = predict_next_rainfall(subdivision)
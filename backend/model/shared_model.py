@@ -0,0 +1,130 @@
+# backend/model/shared_model.py
+"""
+One LSTM shared by every subdivision.
+
+The subdivision is fed in as an integer id and mapped through a learned
+embedding that is concatenated to every time step of the rainfall window,
+so a single forward pass can serve any mix of regions. Each subdivision
+keeps its own min/max scaling, stored together in one .npz file.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from .history_store import normalize_subdivision
+    from .windowing import series_by_subdivision, subdivision_windows, make_tf_dataset
+except ImportError:
+    from history_store import normalize_subdivision
+    from windowing import series_by_subdivision, subdivision_windows, make_tf_dataset
+
+WINDOW_SIZE = 5
+EMBEDDING_DIM = 8
+
+
+class SubdivisionScaling:
+    """Per-subdivision MinMax scaling to [0, 1], indexed by subdivision id."""
+
+    def __init__(self, names, data_min, data_max):
+        self.names = [str(n) for n in names]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.data_min = np.asarray(data_min, dtype=np.float64)
+        self.data_max = np.asarray(data_max, dtype=np.float64)
+        data_range = self.data_max - self.data_min
+        self.data_range = np.where(data_range == 0, 1.0, data_range)
+
+    @classmethod
+    def fit(cls, series):
+        """`series` maps subdivision name -> 1-D array of values."""
+        names = sorted(series)
+        return cls(
+            names,
+            [np.min(series[n]) for n in names],
+            [np.max(series[n]) for n in names],
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['names'], data['data_min'], data['data_max'])
+
+    def save(self, path):
+        np.savez(path, names=np.array(self.names), data_min=self.data_min, data_max=self.data_max)
+
+    def transform(self, ids, values):
+        ids = np.asarray(ids)
+        shape = (-1,) + (1,) * (np.ndim(values) - 1)
+        return (values - self.data_min[ids].reshape(shape)) / self.data_range[ids].reshape(shape)
+
+    def inverse_transform(self, ids, scaled):
+        ids = np.asarray(ids)
+        shape = (-1,) + (1,) * (np.ndim(scaled) - 1)
+        return scaled * self.data_range[ids].reshape(shape) + self.data_min[ids].reshape(shape)
+
+
+def load_annual_series(data_path):
+    df = pd.read_csv(data_path)
+    df['SUBDIVISION'] = df['SUBDIVISION'].map(normalize_subdivision)
+    return series_by_subdivision(df, 'ANNUAL')
+
+
+def build_shared_model(n_subdivisions, window=WINDOW_SIZE, embedding_dim=EMBEDDING_DIM):
+    from keras import Model
+    from keras.layers import LSTM, Dense, Dropout, Embedding, Flatten, Input, RepeatVector, Concatenate
+
+    values = Input(shape=(window, 1), name='window')
+    subdivision = Input(shape=(), dtype='int32', name='subdivision')
+
+    emb = Embedding(n_subdivisions, embedding_dim, name='subdivision_embedding')(subdivision)
+    emb = RepeatVector(window)(Flatten()(emb))
+    x = Concatenate(axis=-1)([values, emb])
+
+    x = LSTM(50, return_sequences=True)(x)
+    x = Dropout(0.2)(x)
+    x = LSTM(50, return_sequences=False)(x)
+    x = Dropout(0.2)(x)
+    out = Dense(1)(x)
+
+    model = Model(inputs=[values, subdivision], outputs=out)
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+
+def make_shared_dataset(series, scaling, window=WINDOW_SIZE, train_fraction=0.8):
+    """
+    Windows are built inside each subdivision (never across two of them) and
+    split chronologically per subdivision, so every region is in both sets.
+    """
+    def transform(name, values):
+        return scaling.transform(np.full(len(values), scaling.index[name]), values)
+
+    splits = subdivision_windows(series, window, train_fraction, transform=transform)
+    return tuple(
+        (X, np.array([scaling.index[n] for n in names], dtype=np.int32), y)
+        for X, y, names in splits
+    )
+
+
+def train_shared_model(data_path, model_path, scaling_path, epochs=30, batch_size=32):
+    from keras.callbacks import EarlyStopping
+
+    series = load_annual_series(data_path)
+    scaling = SubdivisionScaling.fit(series)
+    (X_train, id_train, y_train), (X_test, id_test, y_test) = make_shared_dataset(series, scaling)
+
+    model = build_shared_model(len(scaling.names))
+    early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
+    history = model.fit(
+        make_tf_dataset((X_train, id_train), y_train, batch_size, shuffle=True),
+        validation_data=make_tf_dataset((X_test, id_test), y_test, batch_size),
+        epochs=epochs,
+        verbose=1,
+        callbacks=[early_stop]
+    )
+
+    model.save(model_path)
+    scaling.save(scaling_path)
+
+    y_pred = model.predict([X_test, id_test], verbose=0)[:, 0]
+    y_true_mm = scaling.inverse_transform(id_test, y_test)
+    y_pred_mm = scaling.inverse_transform(id_test, y_pred)
+    return model, history, y_true_mm, y_pred_mm
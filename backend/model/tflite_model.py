@@ -0,0 +1,75 @@
+# backend/model/tflite_model.py
+"""
+TensorFlow-free inference for exported .tflite models (see export_models.py).
+
+The interpreter comes from the small LiteRT / tflite-runtime wheels when they
+are installed and only falls back to full TensorFlow otherwise.
+"""
+import threading
+
+import numpy as np
+
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLiteModel:
+    """
+    Callable wrapper around a tflite Interpreter: `model(x)` or `model(x, ids)`.
+
+    Exported models have a static batch size (export_models.py), so inputs
+    are fed in chunks of that size, zero-padding the last one. Inputs are
+    matched to the model's input tensors by dtype (float windows, int32
+    subdivision ids), and calls are serialized because an Interpreter is
+    not thread-safe.
+    """
+
+    def __init__(self, path, num_threads=1):
+        self.path = path
+        self._interpreter = _interpreter_class()(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._inputs = self._interpreter.get_input_details()
+        self._output = self._interpreter.get_output_details()[0]
+        self.batch_size = int(self._inputs[0]['shape'][0])
+        self._lock = threading.Lock()
+
+    def _bind(self, arrays):
+        bound = []
+        remaining = list(arrays)
+        for detail in self._inputs:
+            for n, arr in enumerate(remaining):
+                if np.issubdtype(arr.dtype, np.integer) == np.issubdtype(detail['dtype'], np.integer):
+                    bound.append((detail, remaining.pop(n).astype(detail['dtype'], copy=False)))
+                    break
+            else:
+                raise ValueError(f"No input matches tensor {detail['name']} ({detail['dtype']})")
+        return bound
+
+    def __call__(self, *arrays):
+        bound = self._bind([np.asarray(a) for a in arrays])
+        n = len(bound[0][1])
+        b = self.batch_size
+        out = []
+        with self._lock:
+            for start in range(0, n, b):
+                for detail, arr in bound:
+                    chunk = arr[start:start + b]
+                    if len(chunk) < b:
+                        pad = np.zeros((b - len(chunk),) + chunk.shape[1:], dtype=chunk.dtype)
+                        chunk = np.concatenate([chunk, pad])
+                    self._interpreter.set_tensor(detail['index'], chunk)
+                self._interpreter.invoke()
+                out.append(self._interpreter.get_tensor(self._output['index'])[:n - start].copy())
+        return np.concatenate(out)
@@ -1,8 +1,9 @@
 import os
 os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
 
+import sys
 import json
-import numpy as np
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
@@ -16,6 +17,8 @@ from keras.layers import LSTM, Dense, Dropout
 from keras.callbacks import EarlyStopping
 import joblib
 
+from windowing import series_by_subdivision, subdivision_windows, make_tf_dataset
+
 # ---------------- CONFIG PATHS ---------------- #
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "../.."))
@@ -25,9 +28,40 @@ MODEL_PATH_KERAS = os.path.join(BASE_DIR, "rainfall_lstm.keras")   # modern form
 MODEL_PATH_H5 = os.path.join(BASE_DIR, "lstm_model.h5")            # legacy format
 SCALER_PATH = os.path.join(BASE_DIR, "scaler.pkl")
 
+SHARED_MODEL_PATH = os.path.join(BASE_DIR, "shared_lstm.keras")     # one model for all subdivisions
+SHARED_SCALING_PATH = os.path.join(BASE_DIR, "shared_scaling.npz")  # per-subdivision min/max
+
 PLOTS_DIR = os.path.join(BASE_DIR, "plots")
 os.makedirs(PLOTS_DIR, exist_ok=True)   # Create folder if missing
 
+# ---------------- MODE ---------------- #
+parser = argparse.ArgumentParser(description="Train the rainfall LSTM")
+parser.add_argument(
+    "--mode", choices=["global", "shared"], default="global",
+    help="global: one model over every subdivision's ANNUAL series with a single scaler (default); "
+         "shared: one model for every subdivision, conditioned on a subdivision embedding"
+)
+args = parser.parse_args()
+
+if args.mode == "shared":
+    from shared_model import train_shared_model
+
+    if not os.path.exists(DATA_PATH):
+        raise FileNotFoundError(f"Rain_data.csv not found at {DATA_PATH}")
+
+    _, _, y_true, y_pred = train_shared_model(DATA_PATH, SHARED_MODEL_PATH, SHARED_SCALING_PATH)
+    shared_metrics = {
+        "MSE": float(mean_squared_error(y_true, y_pred)),
+        "MAE": float(mean_absolute_error(y_true, y_pred)),
+        "R2": float(r2_score(y_true, y_pred)),
+    }
+    with open(os.path.join(BASE_DIR, "shared_metrics.json"), "w") as f:
+        json.dump(shared_metrics, f, indent=4)
+
+    print(f"✅ Shared model saved at:\n  - {SHARED_MODEL_PATH}\n  - {SHARED_SCALING_PATH}")
+    print(f"MSE: {shared_metrics['MSE']:.4f}  MAE: {shared_metrics['MAE']:.4f}  R²: {shared_metrics['R2']:.4f}")
+    sys.exit(0)
+
 # ---------------- LOAD DATA ---------------- #
 if not os.path.exists(DATA_PATH):
     raise FileNotFoundError(f"Rain_data.csv not found at {DATA_PATH}")
@@ -38,31 +72,21 @@ df = pd.read_csv(DATA_PATH)
 if "ANNUAL" not in df.columns:
     raise ValueError("CSV must contain 'ANNUAL' column")
 
-rainfall = df["ANNUAL"].values.reshape(-1, 1)
-
-# Scale data
+# Scale data (one scaler over every subdivision's ANNUAL values)
 scaler = MinMaxScaler(feature_range=(0, 1))
-rainfall_scaled = scaler.fit_transform(rainfall)
+scaler.fit(df["ANNUAL"].values.reshape(-1, 1))
 
 # Save scaler
 joblib.dump(scaler, SCALER_PATH)
 
 # ---------------- CREATE DATASETS ---------------- #
-def create_dataset(data, time_step=10):
-    X, y = [], []
-    for i in range(len(data) - time_step):
-        X.append(data[i:i + time_step, 0])
-        y.append(data[i + time_step, 0])
-    return np.array(X), np.array(y)
-
+# Windows stay inside one subdivision; each one is split 80/20 chronologically
 time_step = 10
-X, y = create_dataset(rainfall_scaled, time_step)
-X = X.reshape(X.shape[0], X.shape[1], 1)
-
-# Train-test split
-train_size = int(len(X) * 0.8)
-X_train, X_test = X[:train_size], X[train_size:]
-y_train, y_test = y[:train_size], y[train_size:]
+series = series_by_subdivision(df, "ANNUAL")
+(X_train, y_train, _), (X_test, y_test, _) = subdivision_windows(
+    series, time_step, train_fraction=0.8,
+    transform=lambda name, values: scaler.transform(values.reshape(-1, 1)),
+)
 
 # ---------------- BUILD MODEL ---------------- #
 model = Sequential()
@@ -78,10 +102,9 @@ model.compile(optimizer="adam", loss="mean_squared_error")
 early_stop = EarlyStopping(monitor="val_loss", patience=5, restore_best_weights=True)
 
 history = model.fit(
-    X_train, y_train,
-    validation_data=(X_test, y_test),
+    make_tf_dataset(X_train, y_train, batch_size=32, shuffle=True),
+    validation_data=make_tf_dataset(X_test, y_test, batch_size=32),
     epochs=30,
-    batch_size=32,
     verbose=1,
     callbacks=[early_stop]
 )
@@ -94,7 +117,7 @@ model.save(MODEL_PATH_H5)
 print(f"✅ Model saved at:\n  - {MODEL_PATH_KERAS}\n  - {MODEL_PATH_H5}")
 
 # ---------------- PREDICTIONS ---------------- #
-y_pred = model.predict(X_test)
+y_pred = model.predict(make_tf_dataset(X_test, batch_size=256))
 
 # Inverse transform
 y_test_inv = scaler.inverse_transform(y_test.reshape(-1, 1))
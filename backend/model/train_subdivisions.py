@@ -0,0 +1,289 @@
+# backend/model/train_subdivisions.py
+"""
+Rebuild the per-subdivision models served by predict_rainfall.py
+(<NAME>_lstm.keras + <NAME>_scaler.pkl) in a process pool.
+
+    python backend/model/train_subdivisions.py                 # train what changed
+    python backend/model/train_subdivisions.py --force Kerala  # retrain one
+    python backend/model/train_subdivisions.py --workers 4 --threads 2
+
+A subdivision is skipped when its ANNUAL series and the training settings
+hash to the same value as in the manifest and its artifacts are unchanged.
+The manifest (training_manifest.json) records per subdivision the data hash,
+training time, test metrics and the sha256 of each artifact.
+"""
+import os
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from windowing import subdivision_windows, make_tf_dataset
+
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'Rain_data.csv')
+MANIFEST_PATH = os.path.join(BASE_DIR, 'training_manifest.json')
+
+# Same shape as the models predict_rainfall.py serves
+TRAIN_CONFIG = {
+    'window': 5,            # predict_rainfall.WINDOW_SIZE
+    'units': 50,
+    'epochs': 100,
+    'batch_size': 16,
+    'patience': 10,
+    'train_fraction': 0.8,
+    'seed': 42,
+}
+
+
+def model_name(subdivision):
+    """File prefix predict_rainfall.py looks up for a subdivision."""
+    return subdivision.strip().upper().replace(' ', '_')
+
+
+def artifact_paths(name):
+    return (os.path.join(BASE_DIR, f'{name}_lstm.keras'),
+            os.path.join(BASE_DIR, f'{name}_scaler.pkl'))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_hash(values, config):
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def load_series(data_path=DATA_PATH):
+    """{subdivision as spelled in the CSV: year-sorted ANNUAL array}."""
+    df = pd.read_csv(data_path).sort_values(['SUBDIVISION', 'YEAR'], kind='stable')
+    return {name: group['ANNUAL'].to_numpy(dtype=np.float64)
+            for name, group in df.groupby('SUBDIVISION', sort=False)}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_current(entry, digest):
+    """True if `entry` was trained on `digest` and its artifacts are untouched."""
+    if not entry or entry.get('data_hash') != digest:
+        return False
+    for filename, sha in entry.get('artifacts', {}).items():
+        path = os.path.join(BASE_DIR, filename)
+        if not os.path.exists(path) or file_sha256(path) != sha:
+            return False
+    return bool(entry.get('artifacts'))
+
+
+# ---------------- WORKER ---------------- #
+def _init_worker(threads):
+    """
+    Runs once per worker process, before TensorFlow is imported: every worker
+    gets `threads` intra-op threads and one inter-op thread, so N workers use
+    about N * threads cores instead of each sizing its pools to the machine.
+    """
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _save_atomic(model, scaler, name):
+    import joblib
+
+    model_path, scaler_path = artifact_paths(name)
+    # keras only writes paths ending in .keras
+    tmp_model = model_path[:-len('.keras')] + '.tmp.keras'
+    tmp_scaler = scaler_path + '.tmp'
+    model.save(tmp_model)
+    joblib.dump(scaler, tmp_scaler)
+    os.replace(tmp_model, model_path)
+    os.replace(tmp_scaler, scaler_path)
+    return model_path, scaler_path
+
+
+def train_one(subdivision, values, config):
+    """Train and save one subdivision's model; returns its manifest entry."""
+    import keras
+    from keras.callbacks import EarlyStopping
+    from keras.layers import LSTM, Dense, Input
+    from keras.models import Sequential
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    from sklearn.preprocessing import MinMaxScaler
+
+    start = time.perf_counter()
+    name = model_name(subdivision)
+    window = config['window']
+    keras.utils.set_random_seed(config['seed'])
+
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(values.reshape(-1, 1))
+    (X_train, y_train, _), (X_test, y_test, _) = subdivision_windows(
+        {subdivision: values}, window, config['train_fraction'],
+        transform=lambda _, v: scaler.transform(v.reshape(-1, 1)),
+    )
+    if not len(y_train) or not len(y_test):
+        raise ValueError(f"{subdivision}: not enough years for window {window}")
+
+    model = Sequential([
+        Input(shape=(window, 1)),
+        LSTM(config['units'], activation='relu'),
+        Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    early_stop = EarlyStopping(monitor='val_loss', patience=config['patience'], restore_best_weights=True)
+    history = model.fit(
+        make_tf_dataset(X_train, y_train, config['batch_size'], shuffle=True, seed=config['seed']),
+        validation_data=make_tf_dataset(X_test, y_test, config['batch_size']),
+        epochs=config['epochs'],
+        verbose=0,
+        callbacks=[early_stop],
+    )
+
+    y_pred = scaler.inverse_transform(model.predict(X_test, verbose=0)).reshape(-1)
+    y_true = scaler.inverse_transform(y_test.reshape(-1, 1)).reshape(-1)
+    paths = _save_atomic(model, scaler, name)
+
+    return {
+        'subdivision': subdivision,
+        'rows': int(len(values)),
+        'train_samples': int(len(y_train)),
+        'test_samples': int(len(y_test)),
+        'epochs': len(history.history['loss']),
+        'train_sec': round(time.perf_counter() - start, 2),
+        'metrics': {
+            'MSE': float(mean_squared_error(y_true, y_pred)),
+            'MAE': float(mean_absolute_error(y_true, y_pred)),
+            'R2': float(r2_score(y_true, y_pred)),
+        },
+        'artifacts': {os.path.basename(p): file_sha256(p) for p in paths},
+        'trained_at': int(time.time()),
+        'pid': os.getpid(),
+    }
+
+
+# ---------------- DRIVER ---------------- #
+def train_all(series, workers, threads, force=False, config=TRAIN_CONFIG, manifest_path=MANIFEST_PATH):
+    manifest = load_manifest(manifest_path)
+    entries = manifest.get('subdivisions', {})
+
+    jobs = {}
+    for subdivision, values in series.items():
+        name = model_name(subdivision)
+        digest = data_hash(values, config)
+        if not force and is_current(entries.get(name), digest):
+            print(f"⏭  {name}: unchanged")
+            continue
+        jobs[name] = (subdivision, values, digest)
+
+    start = time.perf_counter()
+    failed = []
+    if jobs:
+        print(f"🏋 Training {len(jobs)} model(s) on {workers} worker(s) x {threads} thread(s)")
+        # spawn: TensorFlow is not fork-safe
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = {
+                pool.submit(train_one, subdivision, values, config): name
+                for name, (subdivision, values, _) in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    failed.append(name)
+                    print(f"❌ {name}: {e}")
+                    continue
+                entry['data_hash'] = jobs[name][2]
+                entries[name] = entry
+                manifest['subdivisions'] = entries
+                save_manifest(manifest, manifest_path)   # keep progress if a later job dies
+                print(f"✅ {name}: {entry['epochs']} epochs in {entry['train_sec']}s, "
+                      f"MAE {entry['metrics']['MAE']:.1f} mm")
+
+    manifest.update({
+        'subdivisions': entries,
+        'config': config,
+        'data_path': os.path.relpath(DATA_PATH, PROJECT_ROOT),
+        'last_run': {
+            'finished_at': int(time.time()),
+            'elapsed_sec': round(time.perf_counter() - start, 2),
+            'workers': workers,
+            'threads_per_worker': threads,
+            'trained': len(jobs) - len(failed),
+            'skipped': len(series) - len(jobs),
+            'failed': failed,
+        },
+    })
+    save_manifest(manifest, manifest_path)
+    return manifest
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Train every per-subdivision LSTM")
+    parser.add_argument('subdivisions', nargs='*', help="only these subdivisions (default: all)")
+    parser.add_argument('--workers', type=int, default=cpus, help="training processes (default: CPU count)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="TensorFlow threads per worker (default: CPU count / workers)")
+    parser.add_argument('--epochs', type=int, default=TRAIN_CONFIG['epochs'])
+    parser.add_argument('--force', action='store_true', help="retrain even if the data is unchanged")
+    args = parser.parse_args()
+
+    series = load_series()
+    if args.subdivisions:
+        wanted = {model_name(s) for s in args.subdivisions}
+        series = {s: v for s, v in series.items() if model_name(s) in wanted}
+        missing = wanted - {model_name(s) for s in series}
+        if missing:
+            parser.error(f"unknown subdivision(s): {', '.join(sorted(missing))}")
+
+    workers = max(1, min(args.workers, len(series)))
+    threads = args.threads or max(1, cpus // workers)
+    config = {**TRAIN_CONFIG, 'epochs': args.epochs}
+
+    manifest = train_all(series, workers, threads, force=args.force, config=config)
+    run = manifest['last_run']
+    print(f"📄 {MANIFEST_PATH}: {run['trained']} trained, {run['skipped']} skipped, "
+          f"{len(run['failed'])} failed in {run['elapsed_sec']}s")
+    if run['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
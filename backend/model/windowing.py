@@ -0,0 +1,80 @@
+# backend/model/windowing.py
+"""
+Sliding windows for the rainfall LSTMs.
+
+Windows are strided views over each subdivision's own series
+(numpy.lib.stride_tricks.sliding_window_view), so building them copies
+nothing and a window never spans the end of one subdivision and the start
+of the next. The only copy is the final concatenation into the training
+arrays fed to tf.data.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def series_by_subdivision(df, column='ANNUAL'):
+    """{subdivision: year-sorted 1-D float64 array of `column`}."""
+    df = df.sort_values(['SUBDIVISION', 'YEAR'], kind='stable') if 'YEAR' in df else df
+    return {name: group[column].to_numpy(dtype=np.float64)
+            for name, group in df.groupby('SUBDIVISION', sort=False)}
+
+
+def make_windows(values, window):
+    """
+    (X, y) for one series: X[i] = values[i:i + window] and y[i] = values[i + window].
+    X is a read-only view of `values`; both are empty if the series is too short.
+    """
+    values = np.asarray(values)
+    if len(values) <= window:
+        return np.empty((0, window) + values.shape[1:], values.dtype), values[:0]
+    X = sliding_window_view(values[:-1], window, axis=0)
+    if values.ndim > 1:
+        X = np.moveaxis(X, -1, 1)   # (n, features, window) -> (n, window, features)
+    return X, values[window:]
+
+
+def subdivision_windows(series, window, train_fraction=0.8, transform=None):
+    """
+    Windows for every subdivision in `series` ({name: 1-D array}), split
+    chronologically inside each subdivision so every region is in both sets.
+
+    `transform(name, values)` scales a series before windowing (e.g. a fitted
+    scaler). Returns (train, test); each is (X, y, names) with X shaped
+    (n, window, 1) float32, y (n,) float32 and names the subdivision of each row.
+    """
+    parts = {'train': ([], [], []), 'test': ([], [], [])}
+    for name, values in series.items():
+        values = np.asarray(values if transform is None else transform(name, values), dtype=np.float32)
+        X, y = make_windows(values.reshape(-1), window)
+        n = len(y)
+        if not n:
+            continue
+        cut = int(n * train_fraction)
+        for split, sl in (('train', slice(0, cut)), ('test', slice(cut, n))):
+            parts[split][0].append(X[sl])
+            parts[split][1].append(y[sl])
+            parts[split][2].append(np.full(len(y[sl]), name, dtype=object))
+
+    def stack(split):
+        X, y, names = parts[split]
+        if not y:
+            return np.empty((0, window, 1), np.float32), np.empty(0, np.float32), np.empty(0, object)
+        return np.concatenate(X)[..., None], np.concatenate(y), np.concatenate(names)
+
+    return stack('train'), stack('test')
+
+
+def make_tf_dataset(inputs, y=None, batch_size=32, shuffle=False, seed=None):
+    """
+    Batched, prefetching tf.data pipeline over in-memory arrays. `inputs` may
+    be an array or a tuple of arrays (multi-input models). Batches are
+    prepared on a background thread while the previous one trains.
+    """
+    import tensorflow as tf
+
+    inputs = tuple(inputs) if isinstance(inputs, (list, tuple)) else inputs
+    ds = tf.data.Dataset.from_tensor_slices(inputs if y is None else (inputs, y))
+    if shuffle:
+        n = len(y) if y is not None else len(inputs[0] if isinstance(inputs, tuple) else inputs)
+        ds = ds.shuffle(n, seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -6,30 +6,134 @@ import tempfile
 import threading
 
 REALTIME_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'realtime_pdn_data.json')
+SNAPSHOT_INTERVAL_SEC = float(os.getenv("SNAPSHOT_INTERVAL_SEC", "1.0"))
+SNAPSHOT_MAX_DIRTY = int(os.getenv("SNAPSHOT_MAX_DIRTY", "100"))
 save_lock = threading.Lock()
 
-def save_to_json(latest_sensors):
+def _snapshot_rows(latest_sensors):
+    return [
+        {
+            "sensor_id": sid,
+            "subdivision": entry.get("subdivision"),
+            "value": entry.get("value"),
+            "lat": entry.get("lat"),
+            "lon": entry.get("lon")
+        }
+        for sid, entry in list(latest_sensors.items())
+    ]
+
+def save_to_json(latest_sensors, path=REALTIME_JSON):
     """Save latest sensor readings to JSON atomically (no corruption)."""
     try:
         with save_lock:
-            import tempfile, os, json
-            temp_fd, temp_path = tempfile.mkstemp()
+            rows = _snapshot_rows(latest_sensors)
+            temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
             with os.fdopen(temp_fd, 'w') as tmp_file:
-                json.dump([
-                    {
-                        "sensor_id": sid,
-                        "subdivision": entry.get("subdivision"),
-                        "value": entry.get("value"),
-                        "lat": entry.get("lat"),
-                        "lon": entry.get("lon")
-                    }
-                    for sid, entry in latest_sensors.items()
-                ], tmp_file, indent=2)
-            os.replace(temp_path, REALTIME_JSON)
+                json.dump(rows, tmp_file, separators=(',', ':'))
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        return True
     except Exception as e:
         print(f"❌ Error saving realtime data: {e}")
+        return False
+
+class SnapshotWriter:
+    """
+    Background writer for realtime_pdn_data.json.
+
+    on_message only calls mark_dirty(); the file is rewritten at most every
+    `interval` seconds, or as soon as `max_dirty` updates are pending, so a
+    burst of readings costs one write instead of one per message.
+    """
+
+    def __init__(self, latest_sensors, path=REALTIME_JSON,
+                 interval=SNAPSHOT_INTERVAL_SEC, max_dirty=SNAPSHOT_MAX_DIRTY):
+        self.latest_sensors = latest_sensors
+        self.path = path
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+        self.updates = 0
+        self.writes = 0
+        self.failures = 0
+        self.total_write_sec = 0.0
+        self.max_write_sec = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def mark_dirty(self, n=1):
+        with self._lock:
+            self._dirty += n
+            self.updates += n
+            full = self._dirty >= self.max_dirty
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write now if anything changed since the last snapshot."""
+        with self._lock:
+            pending, self._dirty = self._dirty, 0
+        if not pending:
+            return False
+        start = time.perf_counter()
+        ok = save_to_json(self.latest_sensors, self.path)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if ok:
+                self.writes += 1
+                self.total_write_sec += elapsed
+                self.max_write_sec = max(self.max_write_sec, elapsed)
+            else:
+                self.failures += 1
+                self._dirty += pending
+        return ok
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "interval_sec": self.interval,
+                "max_dirty": self.max_dirty,
+                "pending": self._dirty,
+                "updates": self.updates,
+                "writes": self.writes,
+                "failures": self.failures,
+                "coalescing_ratio": round(self.updates / self.writes, 2) if self.writes else None,
+                "avg_write_ms": round(1000 * self.total_write_sec / self.writes, 3) if self.writes else None,
+                "max_write_ms": round(1000 * self.max_write_sec, 3),
+            }
+
+def start_mqtt(LATEST_SENSORS, alert_callback, snapshot_writer=None, listeners=()):
+    """
+    Subscribe to rainfall/+/data and keep LATEST_SENSORS current. Each reading
+    is also passed to every listener(sensor_id, entry), e.g. the history store.
+    """
+    if snapshot_writer is None:
+        snapshot_writer = SnapshotWriter(LATEST_SENSORS)
+    snapshot_writer.start()
 
-def start_mqtt(LATEST_SENSORS, alert_callback):
     broker = "test.mosquitto.org"
     port = 1883
     topic = "rainfall/+/data"
@@ -60,7 +164,9 @@ def start_mqtt(LATEST_SENSORS, alert_callback):
             }
 
             LATEST_SENSORS[sensor_id] = entry
-            save_to_json(LATEST_SENSORS)
+            snapshot_writer.mark_dirty()
+            for listener in listeners:
+                listener(sensor_id, entry)
             alert_callback(sensor_id, entry)
 
             print(f"📡 MQTT update -> {sensor_id}: {entry}")
@@ -0,0 +1,275 @@
+# backend/mqtt_ingest.py
+"""
+Asyncio MQTT ingestion service.
+
+paho's network thread only hands raw messages to an asyncio queue. The
+service then decodes and validates them in batches, applies each batch to
+the sensor state in one update, and fans the batch out to a persistence
+stage (snapshot file + history store) and an alerting stage that run
+concurrently as separate tasks.
+
+    python backend/mqtt_ingest.py                  # ingest from the broker
+    python backend/mqtt_ingest.py --bench 50000    # local broker stand-in, msgs/sec
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+from mqtt_client import SnapshotWriter, save_to_json
+from sensor_state import SensorTable
+
+MQTT_BROKER = os.getenv("MQTT_BROKER", "test.mosquitto.org")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_TOPIC = "rainfall/+/data"
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "20000"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+
+
+def decode_message(topic, payload, ts):
+    """(sensor_id, entry) for a rainfall/<sensor_id>/data message; raises on bad input."""
+    parts = topic.split("/")
+    if len(parts) != 3 or parts[0] != "rainfall" or not parts[1]:
+        raise ValueError(f"unexpected topic {topic}")
+    data = json.loads(payload)
+    return parts[1], {
+        "ts": ts,
+        "subdivision": data.get("subdivision"),
+        "value": float(data.get("value", 0)),
+        "lat": float(data.get("lat")),
+        "lon": float(data.get("lon"))
+    }
+
+
+class IngestService:
+    def __init__(self, latest_sensors, alert_callback=None, snapshot_writer=None, listeners=(),
+                 queue_size=INGEST_QUEUE_SIZE, batch_size=INGEST_BATCH_SIZE, alert_batch_callback=None):
+        self.latest_sensors = latest_sensors
+        self.alert_callback = alert_callback
+        self.alert_batch_callback = alert_batch_callback
+        self.snapshot_writer = snapshot_writer
+        self.listeners = list(listeners)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+
+        self.loop = None
+        self._raw = None
+        self._persist = None
+        self._alerts = None
+
+        self.received = 0
+        self.dropped = 0
+        self.invalid = 0
+        self.applied = 0
+        self.batches = 0
+        self.persisted = 0
+        self.alerted = 0
+
+    # ---------------- INPUT (any thread) ---------------- #
+    def feed(self, topic, payload):
+        """Thread-safe entry point, called from paho's network thread."""
+        self.loop.call_soon_threadsafe(self._enqueue, (topic, payload, int(time.time())))
+
+    def _enqueue(self, item):
+        try:
+            self._raw.put_nowait(item)
+            self.received += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    # ---------------- STAGES ---------------- #
+    async def _next_batch(self, q):
+        batch = [await q.get()]
+        while len(batch) < self.batch_size and not q.empty():
+            batch.append(q.get_nowait())
+        return batch
+
+    async def _decode_and_apply(self):
+        while True:
+            raw = await self._next_batch(self._raw)
+            entries = []
+            for topic, payload, ts in raw:
+                try:
+                    entries.append(decode_message(topic, payload, ts))
+                except Exception:
+                    self.invalid += 1
+
+            if entries:
+                # Later readings of the same sensor in a batch win, as they would one by one
+                self.latest_sensors.update(entries)
+                self.applied += len(entries)
+                self.batches += 1
+                await self._persist.put(entries)
+                await self._alerts.put(entries)
+
+    async def _persistence_stage(self):
+        while True:
+            entries = await self._persist.get()
+            if self.snapshot_writer is not None:
+                self.snapshot_writer.mark_dirty(len(entries))
+            for listener in self.listeners:
+                for sensor_id, entry in entries:
+                    listener(sensor_id, entry)
+            self.persisted += len(entries)
+
+    async def _alert_stage(self):
+        while True:
+            entries = await self._alerts.get()
+            # The callback may block (e.g. inline Telegram calls); keep it off the loop
+            await self.loop.run_in_executor(None, self._alert_batch, entries)
+            self.alerted += len(entries)
+
+    def _alert_batch(self, entries):
+        if self.alert_batch_callback is not None:
+            try:
+                self.alert_batch_callback(entries)
+            except Exception as e:
+                print(f"❌ Alert batch callback failed: {e}")
+        if self.alert_callback is None:
+            return
+        for sensor_id, entry in entries:
+            try:
+                self.alert_callback(sensor_id, entry)
+            except Exception as e:
+                print(f"❌ Alert callback failed for {sensor_id}: {e}")
+
+    async def run(self, ready=None):
+        self.loop = asyncio.get_running_loop()
+        self._raw = asyncio.Queue(maxsize=self.queue_size)
+        self._persist = asyncio.Queue(maxsize=64)
+        self._alerts = asyncio.Queue(maxsize=64)
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.start()
+        if ready is not None:
+            ready.set()
+        await asyncio.gather(self._decode_and_apply(), self._persistence_stage(), self._alert_stage())
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "applied": self.applied,
+            "batches": self.batches,
+            "avg_batch": round(self.applied / self.batches, 1) if self.batches else None,
+            "persisted": self.persisted,
+            "alerted": self.alerted,
+        }
+
+
+# ---------------- MQTT ---------------- #
+def connect_mqtt(service, broker=MQTT_BROKER, port=MQTT_PORT, topic=MQTT_TOPIC):
+    import paho.mqtt.client as mqtt
+
+    def on_connect(client, userdata, flags, rc):
+        if rc == 0:
+            print("✅ MQTT connected successfully")
+            client.subscribe(topic)
+        else:
+            print(f"❌ MQTT connection failed: {rc}")
+
+    def on_message(client, userdata, msg):
+        service.feed(msg.topic, msg.payload)
+
+    client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
+    print(f"🌐 Connecting to MQTT broker {broker}:{port}, topic={topic}", flush=True)
+    client.connect(broker, port, 60)
+    client.loop_start()   # paho network thread; the asyncio loop does the work
+    return client
+
+
+async def serve():
+    from alerts import check_and_send_alerts
+    from dispatch import AlertDispatcher
+    from sensor_history import SensorHistory
+
+    latest_sensors = SensorTable()
+    dispatcher = AlertDispatcher().start()
+    history = SensorHistory().start()
+    service = IngestService(
+        latest_sensors,
+        snapshot_writer=SnapshotWriter(latest_sensors),
+        listeners=[history.append],
+        # Each batch is evaluated at once; only the resulting alerts reach the dispatcher
+        alert_batch_callback=lambda entries: check_and_send_alerts(entries, submit=dispatcher.submit),
+    )
+    ready = asyncio.Event()
+    task = asyncio.create_task(service.run(ready))
+    await ready.wait()
+    connect_mqtt(service)
+    while True:
+        await asyncio.sleep(60)
+        print(f"📊 Ingest stats: {service.stats()}")
+        if task.done():
+            task.result()
+
+
+# ---------------- BENCHMARK ---------------- #
+def _bench_messages(n, sensors=36):
+    payloads = [
+        json.dumps({"subdivision": f"Subdivision {i}", "value": 50 + i, "lat": 20.0 + i / 10, "lon": 80.0 + i / 10}).encode()
+        for i in range(sensors)
+    ]
+    return [(f"rainfall/sensor{i % sensors + 1}/data", payloads[i % sensors]) for i in range(n)]
+
+
+def bench_legacy(messages, snapshot_path):
+    """Old on_message path: decode, update, rewrite the snapshot, alert — per message."""
+    latest, alerts = {}, []
+    start = time.perf_counter()
+    for topic, payload in messages:
+        sensor_id, entry = decode_message(topic, payload, int(time.time()))
+        latest[sensor_id] = entry
+        save_to_json(latest, snapshot_path)
+        alerts.append(sensor_id)
+    return len(messages) / (time.perf_counter() - start)
+
+
+async def bench_service(messages, snapshot_path):
+    """Broker stand-in: a thread pushes messages through feed() like paho's network thread."""
+    latest, alerts = SensorTable(), []
+    writer = SnapshotWriter(latest, snapshot_path)
+    service = IngestService(latest, lambda sid, entry: alerts.append(sid), snapshot_writer=writer,
+                            queue_size=len(messages) + 1)
+    ready = asyncio.Event()
+    task = asyncio.create_task(service.run(ready))
+    await ready.wait()
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=lambda: [service.feed(t, p) for t, p in messages])
+    producer.start()
+    while service.alerted + service.invalid < len(messages):
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    producer.join()
+    writer.stop()
+    task.cancel()
+    return len(messages) / elapsed, service.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio MQTT ingestion service")
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark N messages against a local stand-in")
+    args = parser.parse_args()
+
+    if not args.bench:
+        asyncio.run(serve())
+        return
+
+    messages = _bench_messages(args.bench)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_n = min(args.bench, 5000)
+        legacy = bench_legacy(messages[:legacy_n], os.path.join(tmp, "legacy.json"))
+        rate, stats = asyncio.run(bench_service(messages, os.path.join(tmp, "service.json")))
+    print(f"legacy per-message path ({legacy_n} msgs): {legacy:,.0f} msgs/sec")
+    print(f"asyncio batched service ({args.bench} msgs): {rate:,.0f} msgs/sec")
+    print(f"stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
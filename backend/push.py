@@ -0,0 +1,163 @@
+# backend/push.py
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from pywebpush import WebPusher
+from py_vapid import Vapid
+
+from http_client import get_session
+
+PUSH_WORKERS = int(os.getenv("PUSH_WORKERS", "16"))
+PUSH_TIMEOUT_SEC = float(os.getenv("PUSH_TIMEOUT_SEC", "10"))
+PUSH_TTL_SEC = int(os.getenv("PUSH_TTL_SEC", "3600"))     # how long push services hold undelivered alerts
+VAPID_TOKEN_SEC = 12 * 3600                              # max JWT lifetime push services accept
+GONE_STATUSES = (404, 410)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[idx], 1)
+
+
+class VapidSigner:
+    """
+    Loads the VAPID key once and reuses each signed JWT for every endpoint of
+    the same push service (audience) until it is close to expiring, instead
+    of parsing the key and signing an ES256 token per subscription.
+    """
+
+    def __init__(self, private_key, claims):
+        self.private_key = private_key
+        self.claims = dict(claims)
+        self._vapid = None
+        self._headers = {}   # audience -> (exp, headers)
+        self._lock = threading.Lock()
+        self.signed = 0
+
+    @property
+    def vapid(self):
+        if self._vapid is None:
+            if not self.private_key:
+                raise ValueError("missing VAPID private key")
+            if os.path.isfile(self.private_key):
+                self._vapid = Vapid.from_file(private_key_file=self.private_key)
+            else:
+                self._vapid = Vapid.from_string(private_key=self.private_key)
+        return self._vapid
+
+    def headers(self, endpoint):
+        url = urlparse(endpoint)
+        aud = f"{url.scheme}://{url.netloc}"
+        now = int(time.time())
+        with self._lock:
+            cached = self._headers.get(aud)
+            if cached is not None and cached[0] - now > 600:
+                return cached[1]
+            exp = now + VAPID_TOKEN_SEC
+            headers = self.vapid.sign({**self.claims, "aud": aud, "exp": exp})
+            self._headers[aud] = (exp, headers)
+            self.signed += 1
+            return headers
+
+
+class PushEngine:
+    """
+    Sends one WebPush payload to every subscription concurrently through a
+    bounded thread pool (sharing the pooled HTTP session). Subscriptions the
+    push service reports as gone (404/410) are removed from the store
+    (anything with all() and remove(endpoint), e.g. SubscriptionStore).
+    Each send_all() returns a delivery report with throughput and latency
+    percentiles; stats() aggregates them.
+    """
+
+    def __init__(self, store, private_key, claims, workers=PUSH_WORKERS,
+                 timeout=PUSH_TIMEOUT_SEC, ttl=PUSH_TTL_SEC):
+        self.store = store
+        self.signer = VapidSigner(private_key, claims)
+        self.timeout = timeout
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webpush")
+        self._lock = threading.Lock()
+
+        self.workers = workers
+        self.batches = 0
+        self.sent = 0
+        self.failed = 0
+        self.pruned = 0
+        self.last_batch = None
+
+    def _send_one(self, sub, data):
+        start = time.perf_counter()
+        try:
+            headers = dict(self.signer.headers(sub['endpoint']))
+            resp = WebPusher(sub, requests_session=get_session()).send(
+                data, headers, ttl=self.ttl, timeout=self.timeout
+            )
+            status = resp.status_code
+        except Exception as e:
+            print(f"❌ WebPush error: {e}")
+            status = None
+        return sub['endpoint'], status, 1000 * (time.perf_counter() - start)
+
+    def send_all(self, payload, subscriptions=None):
+        subs = self.store.all() if subscriptions is None else list(subscriptions)
+        report = {"subscriptions": len(subs), "sent": 0, "failed": 0, "pruned": 0}
+        if not subs:
+            return report
+        try:
+            self.signer.vapid
+        except Exception as e:
+            print(f"❌ WebPush disabled: {e}")
+            report["failed"] = len(subs)
+            report["error"] = str(e)
+            return report
+
+        data = json.dumps(payload)
+        start = time.perf_counter()
+        results = list(self._pool.map(lambda sub: self._send_one(sub, data), subs))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(ms for _, _, ms in results)
+        for endpoint, status, _ in results:
+            if status is not None and status <= 202:
+                report["sent"] += 1
+                continue
+            report["failed"] += 1
+            if status in GONE_STATUSES:
+                self.store.remove(endpoint)
+                report["pruned"] += 1
+
+        report.update({
+            "elapsed_ms": round(1000 * elapsed, 1),
+            "per_sec": round(len(subs) / elapsed, 1) if elapsed else None,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+        })
+        with self._lock:
+            self.batches += 1
+            self.sent += report["sent"]
+            self.failed += report["failed"]
+            self.pruned += report["pruned"]
+            self.last_batch = report
+        print(f"📨 WebPush batch: {report['sent']}/{len(subs)} sent, {report['pruned']} pruned, "
+              f"{report['per_sec']}/s, p95 {report['p95_ms']} ms")
+        return report
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "batches": self.batches,
+                "sent": self.sent,
+                "failed": self.failed,
+                "pruned": self.pruned,
+                "vapid_tokens_signed": self.signer.signed,
+                "last_batch": self.last_batch,
+            }
@@ -0,0 +1,103 @@
+# backend/render_cache.py
+import os
+import gzip
+import hashlib
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+Rendered = namedtuple('Rendered', 'version html gzip')
+
+
+def content_version(raw):
+    """Short content hash of the source data a page is rendered from."""
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class RenderCache:
+    """
+    Rendered HTML pages keyed by name and source-data version.
+
+    get() returns the cached page while `version` is unchanged; otherwise
+    it calls `render()` once, keeps the HTML plus a gzip copy in memory and
+    writes the file to `static_dir` through a unique temp file + rename, so
+    readers of the file (the Streamlit dashboard) never see a partial page.
+    Concurrent requests for the same stale page wait for the one render in
+    progress instead of rendering it again.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self._entries = {}   # name -> Rendered
+        self._lock = threading.Lock()
+        self._name_locks = {}
+
+        self.hits = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.render_sec = 0.0
+
+    def _name_lock(self, name):
+        with self._lock:
+            lock = self._name_locks.get(name)
+            if lock is None:
+                lock = self._name_locks[name] = threading.Lock()
+            return lock
+
+    def _lookup(self, name, version):
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == version:
+            return entry
+        return None
+
+    def get(self, name, version, render, filename=None):
+        entry = self._lookup(name, version)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        with self._name_lock(name):
+            entry = self._lookup(name, version)
+            if entry is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return entry
+
+            start = time.perf_counter()
+            html = render().encode('utf-8')
+            entry = Rendered(version, html, gzip.compress(html, compresslevel=6, mtime=0))
+            if filename:
+                self._write(filename, html)
+            with self._lock:
+                self._entries[name] = entry
+                self.renders += 1
+                self.render_sec += time.perf_counter() - start
+            return entry
+
+    def _write(self, filename, html):
+        path = os.path.join(self.static_dir, filename)
+        fd, temp_path = tempfile.mkstemp(dir=self.static_dir, prefix=f'.{filename}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(html)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pages": {
+                    name: {"version": e.version, "bytes": len(e.html), "gzip_bytes": len(e.gzip)}
+                    for name, e in self._entries.items()
+                },
+                "hits": self.hits,
+                "renders": self.renders,
+                "coalesced": self.coalesced,
+                "avg_render_ms": round(1000 * self.render_sec / self.renders, 1) if self.renders else None,
+            }
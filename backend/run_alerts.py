@@ -4,6 +4,8 @@ print("🚀 run_alerts.py starting...")  # DEBUG
 
 from mqtt_client import start_mqtt
 from alerts import check_and_send_alert
+from dispatch import AlertDispatcher
+from sensor_state import SensorTable
 
 def alert_handler(sensor_id, entry):
     """Wrapper around check_and_send_alert for debug logging."""
@@ -12,5 +14,6 @@ def alert_handler(sensor_id, entry):
 
 if __name__ == "__main__":
     print("🚀 Entering __main__ block")  # DEBUG
-    LATEST_SENSORS = {}
-    start_mqtt(LATEST_SENSORS, alert_handler)
+    LATEST_SENSORS = SensorTable()
+    dispatcher = AlertDispatcher().start()
+    start_mqtt(LATEST_SENSORS, dispatcher.callback(alert_handler))
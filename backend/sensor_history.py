@@ -0,0 +1,248 @@
+# backend/sensor_history.py
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+HISTORY_DB = os.getenv(
+    "SENSOR_HISTORY_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'sensor_history.db')
+)
+HISTORY_BATCH_SIZE = int(os.getenv("SENSOR_HISTORY_BATCH_SIZE", "500"))
+HISTORY_FLUSH_SEC = float(os.getenv("SENSOR_HISTORY_FLUSH_SEC", "1.0"))
+HISTORY_RAW_DAYS = float(os.getenv("SENSOR_HISTORY_RAW_DAYS", "7"))
+HISTORY_MINUTE_DAYS = float(os.getenv("SENSOR_HISTORY_MINUTE_DAYS", "30"))   # 1-minute rollups; 0 = forever
+
+ROLLUP_STEPS = (60, 3600, 86400)   # 1 min, 1 hour, 1 day
+MAX_POINTS = 1000                  # auto-chosen step keeps responses below this
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    sensor_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS readings_sensor_ts ON readings (sensor_id, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    sensor_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (sensor_id, step, bucket)
+) WITHOUT ROWID;
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO rollups (sensor_id, step, bucket, count, sum, min, max)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (sensor_id, step, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    sum = sum + excluded.sum,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max)
+"""
+
+
+def parse_step(step):
+    """'300', '5m', '1h', '1d' -> seconds; None/'' -> None; 'raw' -> 0."""
+    if step in (None, ''):
+        return None
+    step = str(step).strip().lower()
+    if step == 'raw':
+        return 0
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if step[-1] in units:
+        return int(float(step[:-1]) * units[step[-1]])
+    return int(step)
+
+
+class SensorHistory:
+    """
+    Embedded time-series store for sensor readings (SQLite in WAL mode).
+
+    append() only enqueues; a writer thread inserts readings in batches and
+    folds each batch into 1-minute / 1-hour / 1-day rollups in the same
+    transaction. Range queries are answered from the coarsest rollup that
+    fits the requested step, never by scanning raw readings (unless
+    step='raw' is asked for explicitly).
+
+    Raw readings are kept for `raw_days` and 1-minute rollups for
+    `minute_days`; hourly and daily rollups are kept forever.
+    """
+
+    def __init__(self, path=HISTORY_DB, batch_size=HISTORY_BATCH_SIZE,
+                 flush_sec=HISTORY_FLUSH_SEC, raw_days=HISTORY_RAW_DAYS,
+                 minute_days=HISTORY_MINUTE_DAYS):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.flush_sec = flush_sec
+        self.raw_days = raw_days
+        self.minute_days = minute_days
+        self._queue = queue.Queue(maxsize=batch_size * 20)
+        self._local = threading.local()
+        self._thread = None
+        self._last_prune = 0.0
+
+        self.appended = 0
+        self.dropped = 0
+        self.batches = 0
+        self.written = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sensor-history", daemon=True)
+            self._thread.start()
+        return self
+
+    # ---------------- WRITE PATH ---------------- #
+    def append(self, sensor_id, entry):
+        """Queue one reading; never blocks ingestion (drops when the queue is full)."""
+        try:
+            value = float(entry.get('value'))
+            ts = int(entry.get('ts') or time.time())
+        except (TypeError, ValueError):
+            return False
+        try:
+            self._queue.put_nowait((str(sensor_id), ts, value))
+            self.appended += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _drain(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_sec))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write_batch(self, conn, batch):
+        rollups = {}
+        for sensor_id, ts, value in batch:
+            for step in ROLLUP_STEPS:
+                key = (sensor_id, step, ts - ts % step)
+                agg = rollups.get(key)
+                if agg is None:
+                    rollups[key] = [1, value, value, value]
+                else:
+                    agg[0] += 1
+                    agg[1] += value
+                    agg[2] = min(agg[2], value)
+                    agg[3] = max(agg[3], value)
+
+        with conn:
+            conn.executemany("INSERT INTO readings (sensor_id, ts, value) VALUES (?, ?, ?)", batch)
+            conn.executemany(UPSERT_ROLLUP, [key + tuple(agg) for key, agg in rollups.items()])
+
+    def _prune(self, conn, now=None):
+        now = time.time() if now is None else now
+        if not (self.raw_days or self.minute_days) or now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        with conn:
+            if self.raw_days:
+                conn.execute("DELETE FROM readings WHERE ts < ?", (int(now - self.raw_days * 86400),))
+            if self.minute_days:
+                conn.execute("DELETE FROM rollups WHERE step = ? AND bucket < ?",
+                             (ROLLUP_STEPS[0], int(now - self.minute_days * 86400)))
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = self._drain()
+            if batch:
+                try:
+                    self.write_batch(conn, batch)
+                    self.batches += 1
+                    self.written += len(batch)
+                except Exception as e:
+                    print(f"❌ Sensor history write failed ({len(batch)} readings): {e}")
+            self._prune(conn)
+
+    # ---------------- READ PATH ---------------- #
+    def query(self, sensor_id, start, end, step=None):
+        """
+        Aggregated points for sensor_id in [start, end).
+
+        `step` (seconds) is served from the largest rollup that divides it;
+        None picks the smallest rollup keeping the answer under MAX_POINTS.
+        step=0 returns raw readings.
+        """
+        conn = self._reader()
+        if step == 0:
+            rows = conn.execute(
+                "SELECT ts, value FROM readings WHERE sensor_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                (sensor_id, start, end),
+            ).fetchall()
+            return {'step': 0, 'points': [{'ts': ts, 'value': v} for ts, v in rows]}
+
+        if step is None:
+            span = max(1, end - start)
+            steps = ROLLUP_STEPS
+            # 1-minute rollups older than minute_days have been pruned
+            if self.minute_days and start < time.time() - self.minute_days * 86400:
+                steps = ROLLUP_STEPS[1:]
+            step = next((s for s in steps if span / s <= MAX_POINTS), ROLLUP_STEPS[-1])
+        if step < ROLLUP_STEPS[0]:
+            step = ROLLUP_STEPS[0]
+        # steps that are not a multiple of a rollup are approximated from 1-min buckets
+        dividing = [s for s in ROLLUP_STEPS if step % s == 0]
+        source = max(dividing) if dividing else ROLLUP_STEPS[0]
+
+        rows = conn.execute(
+            """
+            SELECT (bucket / ?) * ? AS b, SUM(count), SUM(sum), MIN(min), MAX(max)
+            FROM rollups
+            WHERE sensor_id = ? AND step = ? AND bucket >= ? AND bucket < ?
+            GROUP BY b ORDER BY b
+            """,
+            (step, step, sensor_id, source, start - start % source, end),
+        ).fetchall()
+        return {
+            'step': step,
+            'source_step': source,
+            'points': [
+                {'ts': b, 'count': n, 'sum': round(total, 3), 'avg': round(total / n, 3),
+                 'min': lo, 'max': hi}
+                for b, n, total, lo, hi in rows
+            ],
+        }
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "appended": self.appended,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "written": self.written,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else None,
+        }
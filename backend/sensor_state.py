@@ -0,0 +1,190 @@
+# backend/sensor_state.py
+import sys
+import json
+import time
+import zlib
+import threading
+
+SENSOR_STATE_STRIPES = 16
+
+
+class SensorRecord:
+    """Latest reading of one sensor. Replaced, never mutated, on update."""
+
+    __slots__ = ('sensor_id', 'ts', 'value', 'lat', 'lon', 'subdivision', 'version')
+
+    def __init__(self, sensor_id, ts, value, lat, lon, subdivision, version):
+        self.sensor_id = sensor_id
+        self.ts = ts
+        self.value = value
+        self.lat = lat
+        self.lon = lon
+        self.subdivision = subdivision
+        self.version = version
+
+    def as_dict(self):
+        return {
+            'ts': self.ts,
+            'subdivision': self.subdivision,
+            'value': self.value,
+            'lat': self.lat,
+            'lon': self.lon,
+        }
+
+
+class SensorTable:
+    """
+    Thread-safe table of the latest reading per sensor.
+
+    Drop-in for the old LATEST_SENSORS dict: `table[sid] = entry`,
+    `table[sid]`, `sid in table`, `items()` and `get()` behave as before
+    (reads return plain dicts). Writers lock only the stripe their sensor
+    hashes to, so Flask threads and the MQTT thread rarely contend.
+
+    Every write bumps a table-wide `version`, and each record keeps the
+    version it was written at. `snapshot_json()` serializes the table once
+    per version and serves the cached bytes until the next change;
+    `changed_since()` returns only the records written after a version.
+    """
+
+    def __init__(self, stripes=SENSOR_STATE_STRIPES):
+        self._stripes = [{} for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._version_lock = threading.Lock()
+        # Start from the clock (µs) so versions keep increasing across
+        # restarts and a client's old ETag / ?since= never matches new data
+        self._version = time.time_ns() // 1000
+        self._snapshot_lock = threading.Lock()
+        self._snapshot = (None, b'{}')
+
+        self.writes = 0
+        self.snapshot_builds = 0
+        self.snapshot_hits = 0
+
+    def _stripe(self, sensor_id):
+        return zlib.crc32(sensor_id.encode()) % len(self._stripes)
+
+    def _next_version(self):
+        with self._version_lock:
+            self._version += 1
+            self.writes += 1
+            return self._version
+
+    @staticmethod
+    def _record(sensor_id, entry, version):
+        subdivision = entry.get('subdivision')
+        return SensorRecord(
+            sensor_id,
+            entry.get('ts'),
+            entry.get('value'),
+            entry.get('lat'),
+            entry.get('lon'),
+            sys.intern(subdivision) if isinstance(subdivision, str) else subdivision,
+            version,
+        )
+
+    @property
+    def version(self):
+        return self._version
+
+    # ---------------- WRITE ---------------- #
+    def __setitem__(self, sensor_id, entry):
+        sensor_id = str(sensor_id)
+        n = self._stripe(sensor_id)
+        with self._locks[n]:
+            self._stripes[n][sensor_id] = self._record(sensor_id, entry, self._next_version())
+
+    def update(self, entries):
+        """Apply (sensor_id, entry) pairs (or a mapping), taking each stripe lock once."""
+        if hasattr(entries, 'items'):
+            entries = entries.items()
+        by_stripe = {}
+        for sensor_id, entry in entries:
+            sensor_id = str(sensor_id)
+            by_stripe.setdefault(self._stripe(sensor_id), []).append((sensor_id, entry))
+        for n, pairs in by_stripe.items():
+            with self._locks[n]:
+                stripe = self._stripes[n]
+                for sensor_id, entry in pairs:
+                    stripe[sensor_id] = self._record(sensor_id, entry, self._next_version())
+
+    # ---------------- READ ---------------- #
+    def record(self, sensor_id):
+        sensor_id = str(sensor_id)
+        return self._stripes[self._stripe(sensor_id)].get(sensor_id)
+
+    def __getitem__(self, sensor_id):
+        rec = self.record(sensor_id)
+        if rec is None:
+            raise KeyError(sensor_id)
+        return rec.as_dict()
+
+    def get(self, sensor_id, default=None):
+        rec = self.record(sensor_id)
+        return default if rec is None else rec.as_dict()
+
+    def __contains__(self, sensor_id):
+        return self.record(sensor_id) is not None
+
+    def __len__(self):
+        return sum(len(s) for s in self._stripes)
+
+    def records(self):
+        """Consistent-per-stripe list of records (records themselves are immutable)."""
+        out = []
+        for lock, stripe in zip(self._locks, self._stripes):
+            with lock:
+                out.extend(stripe.values())
+        return out
+
+    def __iter__(self):
+        return iter([rec.sensor_id for rec in self.records()])
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(rec.sensor_id, rec.as_dict()) for rec in self.records()]
+
+    def changed_since(self, since):
+        """
+        (version, {sensor_id: entry}) for records written after `since`.
+
+        The version is read before scanning, so every write up to it is in
+        the result; writes racing the scan may show up again on the next poll.
+        """
+        current = self._version
+        changed = {rec.sensor_id: rec.as_dict() for rec in self.records() if rec.version > since}
+        return current, changed
+
+    def snapshot(self):
+        """(version, {sensor_id: entry} as compact JSON bytes), rebuilt only after a change."""
+        cached = self._snapshot
+        if cached[0] == self._version:
+            self.snapshot_hits += 1
+            return cached
+        with self._snapshot_lock:
+            cached = self._snapshot
+            current = self._version
+            if cached[0] == current:
+                self.snapshot_hits += 1
+                return cached
+            # Tagged with the version seen before copying: at worst a newer
+            # table is cached under an older version and rebuilt once more.
+            rows = {rec.sensor_id: rec.as_dict() for rec in self.records()}
+            self._snapshot = (current, json.dumps(rows, separators=(',', ':')).encode())
+            self.snapshot_builds += 1
+            return self._snapshot
+
+    def snapshot_json(self):
+        return self.snapshot()[1]
+
+    def stats(self):
+        return {
+            "sensors": len(self),
+            "stripes": len(self._stripes),
+            "version": self._version,
+            "writes": self.writes,
+            "snapshot_builds": self.snapshot_builds,
+            "snapshot_hits": self.snapshot_hits,
+        }
@@ -0,0 +1,116 @@
+# backend/stream.py
+import os
+import json
+import queue
+import threading
+
+STREAM_CLIENT_BUFFER = int(os.getenv("STREAM_CLIENT_BUFFER", "256"))
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "500"))
+STREAM_HEARTBEAT_SEC = float(os.getenv("STREAM_HEARTBEAT_SEC", "15"))
+
+_EVICTED = None
+
+
+class StreamClient:
+    __slots__ = ('queue', 'evicted')
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.evicted = False
+
+
+class SensorStream:
+    """
+    Fan-out of sensor readings to Server-Sent Events clients.
+
+    publish() is a reading listener (same signature as SensorHistory.append):
+    each reading is encoded once and offered to every client's bounded
+    buffer without blocking. A client whose buffer is full is evicted: its
+    pending events are dropped and its stream ends, and the browser's
+    EventSource reconnects and starts again from a fresh snapshot. One slow
+    viewer therefore never delays ingestion or the other viewers.
+    """
+
+    def __init__(self, buffer_size=STREAM_CLIENT_BUFFER, max_clients=STREAM_MAX_CLIENTS,
+                 heartbeat_sec=STREAM_HEARTBEAT_SEC):
+        self.buffer_size = buffer_size
+        self.max_clients = max_clients
+        self.heartbeat_sec = heartbeat_sec
+        self._clients = set()
+        self._lock = threading.Lock()
+
+        self.connects = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self):
+        """New client, or None when max_clients are already connected."""
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                self.rejected += 1
+                return None
+            client = StreamClient(self.buffer_size)
+            self._clients.add(client)
+            self.connects += 1
+            return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def _evict(self, client):
+        client.evicted = True
+        with client.queue.mutex:
+            client.queue.queue.clear()
+        client.queue.put_nowait(_EVICTED)
+        self.evictions += 1
+
+    def publish(self, sensor_id, entry):
+        event = f"event: reading\ndata: {json.dumps({'sensor_id': sensor_id, **entry}, separators=(',', ':'))}\n\n"
+        with self._lock:
+            clients = list(self._clients)
+            self.published += 1
+        slow = []
+        for client in clients:
+            try:
+                client.queue.put_nowait(event)
+            except queue.Full:
+                slow.append(client)
+        with self._lock:
+            self.delivered += len(clients) - len(slow)
+            for client in slow:
+                if client in self._clients:
+                    self._clients.discard(client)
+                    self._evict(client)
+
+    def events(self, client, snapshot_json):
+        """SSE text for one client: a snapshot, then readings and heartbeats."""
+        try:
+            yield f"retry: 3000\nevent: snapshot\ndata: {snapshot_json.decode()}\n\n"
+            while True:
+                try:
+                    event = client.queue.get(timeout=self.heartbeat_sec)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is _EVICTED:
+                    yield "event: evicted\ndata: {}\n\n"
+                    return
+                yield event
+        finally:
+            self.unsubscribe(client)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "max_clients": self.max_clients,
+                "buffer_size": self.buffer_size,
+                "connects": self.connects,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+                "published": self.published,
+                "delivered": self.delivered,
+            }
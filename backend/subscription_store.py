@@ -0,0 +1,257 @@
+# backend/subscription_store.py
+"""
+SQLite store for PWA push subscriptions.
+
+    python backend/subscription_store.py --import data/subscriptions.json backend/data/pwa_subscriptions.json
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBSCRIPTIONS_DB = os.getenv(
+    "SUBSCRIPTIONS_DB",
+    os.path.join(BASE_DIR, '..', 'data', 'subscriptions.db')
+)
+# Files used before the store existed; imported once into an empty store
+LEGACY_SUBSCRIPTION_FILES = (
+    os.path.join(BASE_DIR, '..', 'data', 'subscriptions.json'),
+    os.path.join(BASE_DIR, 'data', 'pwa_subscriptions.json'),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    endpoint TEXT PRIMARY KEY,
+    p256dh TEXT NOT NULL,
+    auth TEXT NOT NULL,
+    subdivision TEXT,
+    region TEXT,
+    created INTEGER NOT NULL,
+    updated INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subscriptions_subdivision ON subscriptions (subdivision);
+CREATE INDEX IF NOT EXISTS subscriptions_region ON subscriptions (region);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+# Bumped in the same transaction as every write, so each process can tell
+# when its cached targeted() results are stale
+BUMP_GENERATION = "UPDATE meta SET value = value + 1 WHERE key = 'generation'"
+GENERATION = "SELECT value FROM meta WHERE key = 'generation'"
+
+UPSERT = """
+INSERT INTO subscriptions (endpoint, p256dh, auth, subdivision, region, created, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (endpoint) DO UPDATE SET
+    p256dh = excluded.p256dh,
+    auth = excluded.auth,
+    subdivision = excluded.subdivision,
+    region = excluded.region,
+    updated = excluded.updated
+"""
+
+
+def _target(name):
+    """Targeting values are matched case/space-insensitively; '' means everywhere."""
+    if name is None:
+        return None
+    name = " ".join(str(name).replace("_", " ").split()).upper()
+    return name or None
+
+
+# IMD's four meteorological regions, by Rain_data.csv subdivision. A
+# subscription pinned to a region gets the alerts of its subdivisions.
+REGIONS = {
+    "NORTHWEST": (
+        "Jammu & Kashmir", "Himachal Pradesh", "Uttarakhand", "Punjab",
+        "Haryana Delhi & Chandigarh", "West Uttar Pradesh", "East Uttar Pradesh",
+        "West Rajasthan", "East Rajasthan",
+    ),
+    "CENTRAL": (
+        "West Madhya Pradesh", "East Madhya Pradesh", "Gujarat Region", "Saurashtra & Kutch",
+        "Konkan & Goa", "Madhya Maharashtra", "Matathwada", "Vidarbha", "Chhattisgarh", "Orissa",
+    ),
+    "SOUTH": (
+        "Coastal Andhra Pradesh", "Telangana", "Rayalseema", "Tamil Nadu", "Coastal Karnataka",
+        "North Interior Karnataka", "South Interior Karnataka", "Kerala", "Lakshadweep",
+        "Andaman & Nicobar Islands",
+    ),
+    "EAST": (
+        "Arunachal Pradesh", "Assam & Meghalaya", "Naga Mani Mizo Tripura",
+        "Sub Himalayan West Bengal & Sikkim", "Gangetic West Bengal", "Jharkhand", "Bihar",
+    ),
+}
+SUBDIVISION_REGIONS = {_target(sub): region for region, subs in REGIONS.items() for sub in subs}
+
+
+def region_for(subdivision):
+    """Region of a subdivision, or None if it is not in REGIONS."""
+    return SUBDIVISION_REGIONS.get(_target(subdivision))
+
+
+class SubscriptionStore:
+    """
+    PWA subscriptions keyed by endpoint (re-subscribing updates in place).
+
+    A subscription may be pinned to a subdivision and/or region; targeted()
+    returns the subscribers for an alert there plus everyone who is not
+    pinned. Results are cached in memory and reused while the store's
+    generation counter (bumped by every write, from any process) is
+    unchanged, so sending an alert costs one primary-key lookup.
+    """
+
+    def __init__(self, path=SUBSCRIPTIONS_DB):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._generation = None
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _row(sub, subdivision, region, now):
+        keys = sub.get('keys') or {}
+        if not sub.get('endpoint') or not keys.get('p256dh') or not keys.get('auth'):
+            raise ValueError("subscription needs endpoint, keys.p256dh and keys.auth")
+        if _target(region) is not None and _target(region) not in REGIONS:
+            raise ValueError(f"region must be one of {', '.join(REGIONS)}")
+        return (sub['endpoint'], keys['p256dh'], keys['auth'], _target(subdivision), _target(region), now, now)
+
+    # ---------------- WRITE ---------------- #
+    def upsert(self, sub, subdivision=None, region=None):
+        row = self._row(sub, subdivision, region, int(time.time()))
+        conn = self._conn()
+        with conn:
+            conn.execute(UPSERT, row)
+            conn.execute(BUMP_GENERATION)
+
+    def add(self, sub):
+        self.upsert(sub)
+
+    def remove(self, endpoint):
+        conn = self._conn()
+        with conn:
+            removed = conn.execute("DELETE FROM subscriptions WHERE endpoint = ?", (endpoint,)).rowcount
+            if removed:
+                conn.execute(BUMP_GENERATION)
+        return bool(removed)
+
+    def import_json(self, *paths):
+        """Bulk-upsert subscriptions from JSON list files; returns the number imported."""
+        now = int(time.time())
+        rows = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    subs = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for sub in subs if isinstance(subs, list) else []:
+                try:
+                    rows.append(self._row(sub, sub.get('subdivision'), sub.get('region'), now))
+                except (AttributeError, ValueError):
+                    continue
+        if rows:
+            conn = self._conn()
+            with conn:
+                conn.executemany(UPSERT, rows)
+                conn.execute(BUMP_GENERATION)
+        return len(rows)
+
+    # ---------------- READ ---------------- #
+    def targeted(self, subdivision=None, region=None):
+        """
+        Subscriptions to notify for an alert in subdivision/region (None = all).
+        The region defaults to the subdivision's (region_for); an alert in a
+        subdivision outside REGIONS reaches no region-pinned subscription.
+        """
+        subdivision = _target(subdivision)
+        if region is None and subdivision is not None:
+            region = region_for(subdivision) or ""
+        key = (subdivision, _target(region) if region else region)
+        conn = self._conn()
+        generation = conn.execute(GENERATION).fetchone()[0]
+        with self._lock:
+            if generation != self._generation:
+                self._cache = {}
+                self._generation = generation
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        sql = "SELECT endpoint, p256dh, auth FROM subscriptions"
+        clauses, params = [], []
+        if key[0] is not None:
+            clauses.append("(subdivision IS NULL OR subdivision = ?)")
+            params.append(key[0])
+        if key[1] is not None:
+            clauses.append("(region IS NULL OR region = ?)")
+            params.append(key[1])
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        subs = [
+            {'endpoint': endpoint, 'keys': {'p256dh': p256dh, 'auth': auth}}
+            for endpoint, p256dh, auth in conn.execute(sql, params)
+        ]
+        with self._lock:
+            if self._generation == generation:
+                self._cache[key] = subs
+        return subs
+
+    def all(self):
+        return self.targeted()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "path": self.path,
+            "subscriptions": len(self),
+            "by_subdivision": dict(conn.execute(
+                "SELECT COALESCE(subdivision, '*'), COUNT(*) FROM subscriptions GROUP BY 1"
+            ).fetchall()),
+        }
+
+
+def open_store(path=SUBSCRIPTIONS_DB):
+    """Store at `path`, seeded from the legacy JSON files the first time."""
+    store = SubscriptionStore(path)
+    if not len(store):
+        imported = store.import_json(*LEGACY_SUBSCRIPTION_FILES)
+        if imported:
+            print(f"📥 Imported {imported} PWA subscriptions into {store.path}")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the PWA subscription store")
+    parser.add_argument("--db", default=SUBSCRIPTIONS_DB)
+    parser.add_argument("--import", dest="files", nargs="+", metavar="JSON",
+                        help="subscription list files to upsert")
+    args = parser.parse_args()
+
+    store = SubscriptionStore(args.db)
+    if args.files:
+        print(f"Imported {store.import_json(*args.files)} subscriptions")
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# The backend modules open their SQLite stores at import time; keep them out of data/
+_tmp = tempfile.mkdtemp(prefix="rain-tests-")
+os.environ["ALERT_COOLDOWN_DB"] = os.path.join(_tmp, "alert_cooldowns.db")
+os.environ["SUBSCRIPTIONS_DB"] = os.path.join(_tmp, "subscriptions.db")
+os.environ["SENSOR_HISTORY_DB"] = os.path.join(_tmp, "sensor_history.db")
+os.environ["ALERT_RULES_FILE"] = os.path.join(_tmp, "alert_rules.json")   # missing: default rules
+os.environ["TELEGRAM_DIGEST_SEC"] = "0"
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(1, os.path.join(BACKEND_DIR, "model"))
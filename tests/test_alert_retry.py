@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+import alerts
+from alert_rules import AlertEngine
+from cooldown_store import CooldownStore
+
+
+@pytest.fixture
+def channels(monkeypatch, tmp_path):
+    """Fresh engine and cooldowns; Telegram results are scripted, WebPush always fails."""
+    monkeypatch.setattr(alerts, "ALERT_ENGINE", AlertEngine(rules={}))
+    monkeypatch.setattr(alerts, "COOLDOWNS", CooldownStore(str(tmp_path / "cooldowns.db")))
+    monkeypatch.setattr(alerts, "send_webpush_notification", lambda *a, **k: False)
+
+    results, sent = [], []
+
+    def send(text):
+        ok = results.pop(0) if results else True
+        if ok:
+            sent.append(text.split("\n")[0])
+        return ok
+
+    monkeypatch.setattr(alerts, "send_telegram_message", send)
+    return results, sent
+
+
+def reading(value):
+    alerts.check_and_send_alert("sensor1", {"subdivision": "Kerala", "value": value, "ts": int(time.time())})
+
+
+def test_failed_send_is_retried_on_next_reading(channels):
+    results, sent = channels
+    results.append(False)
+    reading(60)
+    assert sent == []
+    reading(62)
+    assert sent == [alerts.TITLES[1]]
+
+
+def test_escalation_is_not_held_by_cooldown(channels):
+    _, sent = channels
+    reading(60)
+    reading(170)
+    assert sent == [alerts.TITLES[1], alerts.TITLES[3]]
+    reading(175)   # still severe: held by hysteresis and the cooldown
+    assert len(sent) == 2
+
+
+def test_alert_held_by_cooldown_fires_after_it_expires(channels):
+    _, sent = channels
+    reading(60)
+    reading(10)
+    reading(60)   # re-armed, but inside the moderate cooldown
+    assert len(sent) == 1
+    alerts.COOLDOWNS.release("sensor1:1")
+    reading(61)
+    assert sent == [alerts.TITLES[1], alerts.TITLES[1]]
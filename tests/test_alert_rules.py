@@ -0,0 +1,20 @@
+import time
+
+from alert_rules import AlertEngine
+
+
+def readings(sensor_id, values, subdivision="Punjab"):
+    now = int(time.time())
+    return [(sensor_id, {"subdivision": subdivision, "value": v, "ts": now + i}) for i, v in enumerate(values)]
+
+
+def test_accumulation_is_off_by_default():
+    engine = AlertEngine(rules={})
+    fired = engine.evaluate(readings("sensor1", [60, 60, 60, 60]))
+    assert [a["severity"] for a in fired] == ["moderate"]
+
+
+def test_accumulation_rule_escalates_increments():
+    engine = AlertEngine(rules={"subdivisions": {"Kerala": {"accum_mm": 200}}})
+    fired = engine.evaluate(readings("sensor1", [60, 60, 60, 60], subdivision="Kerala"))
+    assert [(a["severity"], a["reason"]) for a in fired] == [("moderate", "value"), ("heavy", "accumulation")]
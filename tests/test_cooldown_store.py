@@ -0,0 +1,20 @@
+from cooldown_store import CooldownStore
+
+
+def test_release_in_one_process_is_seen_by_another(tmp_path):
+    path = str(tmp_path / "cooldowns.db")
+    worker_a, worker_b = CooldownStore(path), CooldownStore(path)
+
+    assert worker_a.acquire("sensor1:1", 600)
+    assert not worker_b.acquire("sensor1:1", 600)
+    worker_a.release("sensor1:1")   # e.g. worker A's send failed
+    assert worker_b.acquire("sensor1:1", 600)
+
+
+def test_own_claim_is_answered_from_memory(tmp_path):
+    store = CooldownStore(str(tmp_path / "cooldowns.db"))
+    assert store.acquire("sensor1:1", 600)
+    assert not store.acquire("sensor1:1", 600)
+    assert store.memory_hits == 1
+    store.release("sensor1:1")
+    assert store.acquire("sensor1:1", 600)
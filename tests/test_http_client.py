@@ -0,0 +1,65 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        server.hits.append((self.command, self.path, self.client_address[1]))
+        status = int(self.path.strip("/") or 200)
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = _reply
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.hits = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_SEC", 0)
+    session = http_client._build_session()
+    yield session
+    session.close()
+
+
+def test_calls_reuse_one_connection(stub, session):
+    server, url = stub
+    for _ in range(10):
+        assert session.get(url + "/200").status_code == 200
+        assert session.post(url + "/200", json={}).status_code == 200
+    assert len(server.hits) == 20
+    assert len({port for _, _, port in server.hits}) == 1
+
+
+def test_get_503_is_retried(stub, session):
+    server, url = stub
+    assert session.get(url + "/503").status_code == 503
+    assert len(server.hits) == 1 + http_client.HTTP_RETRIES
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_post_is_sent_once(stub, session, status):
+    server, url = stub
+    assert session.post(f"{url}/{status}", json={}).status_code == status
+    assert len(server.hits) == 1
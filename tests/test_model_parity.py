@@ -0,0 +1,56 @@
+import os
+import shutil
+
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+
+import numpy as np
+import pytest
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "model")
+SHIPPED_MODELS = ["KERALA_lstm.keras", "PUNJAB_lstm.keras"]
+
+
+def _windows(n=64, seed=0):
+    return np.random.default_rng(seed).random((n, 5, 1), dtype=np.float32)
+
+
+@pytest.mark.parametrize("name", SHIPPED_MODELS)
+def test_tflite_matches_keras(name, tmp_path):
+    pytest.importorskip("tensorflow")
+    export_models = pytest.importorskip("export_models")
+    try:
+        from tflite_model import _interpreter_class
+        _interpreter_class()
+    except ImportError:
+        pytest.skip("no TFLite interpreter")
+
+    keras_path = str(tmp_path / name)
+    shutil.copy(os.path.join(MODEL_DIR, name), keras_path)
+    export_models.export_model(keras_path, export_models.EXPORT_BATCH)
+    assert export_models.parity_error(keras_path) <= export_models.PARITY_TOLERANCE
+
+
+@pytest.mark.parametrize("name", SHIPPED_MODELS)
+def test_numpy_lstm_matches_keras(name):
+    pytest.importorskip("h5py")
+    keras = pytest.importorskip("keras")
+    from export_models import PARITY_TOLERANCE
+    from numpy_lstm import NumpyLSTM
+
+    path = os.path.join(MODEL_DIR, name)
+    x = _windows()
+    expected = np.asarray(keras.models.load_model(path)(x, training=False))
+    actual = np.asarray(NumpyLSTM.from_keras(path)(x))
+    assert np.max(np.abs(expected - actual)) <= PARITY_TOLERANCE
+
+
+def test_stacked_numpy_lstm_matches_single_models():
+    pytest.importorskip("h5py")
+    from numpy_lstm import NumpyLSTM
+
+    models = [NumpyLSTM.from_keras(os.path.join(MODEL_DIR, name)) for name in SHIPPED_MODELS]
+    x = _windows(8)
+    stacked = NumpyLSTM.stack(models)
+    expected = np.stack([np.asarray(m(x)) for m in models])
+    actual = stacked.forward(np.stack([x] * len(models)))
+    assert np.allclose(actual, expected, atol=1e-6)
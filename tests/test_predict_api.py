@@ -0,0 +1,15 @@
+import pytest
+
+app = pytest.importorskip("app")
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("body", [{"subdivisions": "Kerala"}, {"subdivisions": [1, None]}, {"subdivisions": ["Kerala", 2]}])
+def test_batch_rejects_non_string_subdivisions(client, body):
+    resp = client.post("/predict/batch", json=body)
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
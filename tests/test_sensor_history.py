@@ -0,0 +1,20 @@
+import time
+
+from sensor_history import SensorHistory
+
+
+def test_minute_rollups_are_pruned_but_hourly_kept(tmp_path):
+    history = SensorHistory(str(tmp_path / "history.db"), raw_days=1, minute_days=2)
+    now = int(time.time())
+    old = now - 3 * 86400
+    conn = history._connect()
+    history.write_batch(conn, [("s1", old, 5.0), ("s1", now - 60, 7.0)])
+    history._prune(conn, now=now)
+
+    assert conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0] == 1
+    minute = history.query("s1", old - 60, now, step=60)["points"]
+    assert [p["sum"] for p in minute] == [7.0]
+    hourly = history.query("s1", old - 3600, now, step=3600)["points"]
+    assert [p["sum"] for p in hourly] == [5.0, 7.0]
+    # an auto step over a range older than the minute horizon skips 1-minute rollups
+    assert history.query("s1", old - 60, old + 600)["source_step"] == 3600
@@ -0,0 +1,32 @@
+import pytest
+
+from subscription_store import SubscriptionStore, region_for
+
+
+def sub(n):
+    return {"endpoint": f"https://push.example/{n}", "keys": {"p256dh": "key", "auth": "auth"}}
+
+
+def endpoints(subs):
+    return sorted(s["endpoint"].rsplit("/", 1)[1] for s in subs)
+
+
+def test_region_pinned_subscriber_only_gets_its_region(tmp_path):
+    store = SubscriptionStore(str(tmp_path / "subs.db"))
+    store.upsert(sub("everywhere"))
+    store.upsert(sub("south"), region="South")
+    store.upsert(sub("kerala"), subdivision="Kerala")
+
+    assert region_for("Punjab") == "NORTHWEST"
+    assert endpoints(store.targeted("Punjab")) == ["everywhere"]
+    assert endpoints(store.targeted("Tamil Nadu")) == ["everywhere", "south"]
+    assert endpoints(store.targeted("kerala")) == ["everywhere", "kerala", "south"]
+    assert endpoints(store.targeted("Unknown Place")) == ["everywhere"]
+    assert endpoints(store.all()) == ["everywhere", "kerala", "south"]
+
+
+def test_unknown_region_is_rejected(tmp_path):
+    store = SubscriptionStore(str(tmp_path / "subs.db"))
+    with pytest.raises(ValueError):
+        store.upsert(sub(1), region="Atlantis")
+    assert len(store) == 0
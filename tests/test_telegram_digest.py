@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+import alerts
+from alert_rules import AlertEngine
+from cooldown_store import CooldownStore
+
+
+@pytest.fixture
+def digest(monkeypatch, tmp_path):
+    """Digest mode with a scripted Telegram; WebPush always fails."""
+    monkeypatch.setattr(alerts, "ALERT_ENGINE", AlertEngine(rules={}))
+    monkeypatch.setattr(alerts, "COOLDOWNS", CooldownStore(str(tmp_path / "cooldowns.db")))
+    monkeypatch.setattr(alerts, "send_webpush_notification", lambda *a, **k: False)
+    digest = alerts.TelegramDigest(window=3600)
+    digest._thread = object()   # flushed by hand
+    monkeypatch.setattr(alerts, "TELEGRAM_DIGEST", digest)
+
+    results, sent = [], []
+
+    def send(text):
+        ok = results.pop(0) if results else True
+        if ok:
+            sent.append(text)
+        return ok
+
+    monkeypatch.setattr(alerts, "send_telegram_message", send)
+    return digest, results, sent
+
+
+def reading(sensor_id, value, subdivision="Kerala"):
+    alerts.check_and_send_alert(sensor_id, {"subdivision": subdivision, "value": value, "ts": int(time.time())})
+
+
+def test_failed_digest_is_sent_on_next_flush(digest):
+    digest, results, sent = digest
+    reading("sensor1", 60)
+    results.append(False)
+    assert digest.flush() == 0
+    assert digest.flush() == 1
+    assert "sensor1" in sent[0]
+
+
+def test_undeliverable_digest_alert_is_retried_by_next_reading(digest):
+    digest, results, sent = digest
+    reading("sensor1", 60)
+    for _ in range(alerts.TELEGRAM_DIGEST_ATTEMPTS):
+        results.append(False)
+        digest.flush()
+    assert digest.flush() == 0   # given back, nothing pending
+    reading("sensor1", 62)
+    assert digest.flush() == 1
+    assert "62.0 mm" in sent[0]
+
+
+def test_digest_escapes_markdown(digest):
+    digest, _, sent = digest
+    reading("rain_*gauge`1", 60, subdivision="Jammu_&_Kashmir *North*")
+    digest.flush()
+    assert "`rain_*gauge'1`" in sent[0]
+    assert "Jammu\\_&\\_Kashmir \\*North\\*" in sent[0]